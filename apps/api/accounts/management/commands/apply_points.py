@@ -0,0 +1,52 @@
+import time
+from django.core.management.base import BaseCommand
+from accounts.points import apply_pending_points, rebuild_points_balances
+
+
+class Command(BaseCommand):
+    help = 'Apply pending loyalty points transactions to user balances'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of transactions to apply per database transaction (default: 500)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute all balances from the ledger instead',
+        )
+        parser.add_argument(
+            '--continuous',
+            action='store_true',
+            help='Keep running, sleeping between passes',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=10,
+            help='Seconds to sleep between passes in continuous mode (default: 10)'
+        )
+    
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            started = time.monotonic()
+            users = rebuild_points_balances()
+            self.stdout.write(
+                self.style.SUCCESS(f'Rebuilt {users} balances in {time.monotonic() - started:.1f}s')
+            )
+            return
+        
+        while True:
+            transactions = 0
+            for applied, users in apply_pending_points(batch_size=options['batch_size']):
+                transactions += applied
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Applied {applied} transactions to {users} users')
+            
+            self.stdout.write(self.style.SUCCESS(f'Applied {transactions} points transactions'))
+            if not options['continuous']:
+                return
+            time.sleep(options['sleep'])
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-17 08:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_number_sequence'),
+        ('accounts', '0002_user_points'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointstransaction',
+            name='applied_at',
+            field=models.DateTimeField(blank=True, help_text="When the amount was added to the user's balance", null=True),
+        ),
+        migrations.AddField(
+            model_name='pointstransaction',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='points_transactions', to='orders.order'),
+        ),
+        migrations.AddIndex(
+            model_name='pointstransaction',
+            index=models.Index(condition=models.Q(('applied_at__isnull', True)), fields=['id'], name='points_txn_pending_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='pointstransaction',
+            constraint=models.UniqueConstraint(fields=('order',), name='unique_points_award_per_order'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -24,15 +27,20 @@ class User(AbstractUser):
         return 'customer' in self.roles or not self.roles
     
     def add_points(self, amount, reason=""):
-        """Add points to user account."""
-        self.points += amount
-        self.save(update_fields=['points'])
-        # Log points transaction
-        PointsTransaction.objects.create(
-            user=self,
-            amount=amount,
-            reason=reason
-        )
+        """Add points to user account immediately (order awards go through accounts.points)."""
+        from .points import lock_balances
+        
+        with transaction.atomic():
+            lock_balances()
+            # Log points transaction
+            PointsTransaction.objects.create(
+                user=self,
+                amount=amount,
+                reason=reason,
+                applied_at=timezone.now()
+            )
+            User.objects.filter(pk=self.pk).update(points=Greatest(F('points') + amount, 0))
+        self.refresh_from_db(fields=['points'])
     
     def get_badge_level(self):
         """Get user's current badge level based on points."""
@@ -52,10 +60,20 @@ class PointsTransaction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='points_transactions')
     amount = models.IntegerField(help_text="Points amount (positive for earned, negative for spent)")
     reason = models.CharField(max_length=255, help_text="Reason for points transaction")
+    order = models.ForeignKey(
+        'orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='points_transactions'
+    )
+    applied_at = models.DateTimeField(null=True, blank=True, help_text="When the amount was added to the user's balance")
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['order'], name='unique_points_award_per_order'),
+        ]
+        indexes = [
+            models.Index(fields=['id'], condition=Q(applied_at__isnull=True), name='points_txn_pending_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.amount} points - {self.reason}"
\ No newline at end of file
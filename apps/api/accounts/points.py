@@ -0,0 +1,116 @@
+"""
+Loyalty points ledger.
+
+``PointsTransaction`` is the ledger and ``User.points`` a balance derived from
+it. Paying for an order records its award as a pending transaction
+(``applied_at`` unset); the unique constraint on ``order`` makes that
+idempotent, so saving a paid order again never awards twice. Recording is a
+single insert and never touches the user row.
+
+Pending transactions are applied off the request path by
+``apply_pending_points`` (the ``apply_points`` command): batches are claimed
+with ``FOR UPDATE SKIP LOCKED`` and each user gets one ``F('points') + n``
+update per batch, so concurrent workers neither block each other nor apply a
+transaction twice. ``rebuild_points_balances`` recomputes balances from the
+ledger in one statement. Balance updates (workers and ``User.add_points``)
+hold a shared advisory lock and the rebuild an exclusive one, so no increment
+can land between the rebuild's snapshot and its update. Balances never go
+below zero.
+"""
+
+from collections import Counter
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import PointsTransaction, User
+
+# Advisory lock key serializing rebuilds against balance updates.
+BALANCE_LOCK_ID = 0x706F696E7473  # 'points'
+
+
+def lock_balances(exclusive=False):
+    """Take the balance lock until the end of the current transaction."""
+    function = 'pg_advisory_xact_lock' if exclusive else 'pg_advisory_xact_lock_shared'
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {function}(%s)', [BALANCE_LOCK_ID])
+
+
+def points_for_order(order):
+    # One point per whole currency unit spent.
+    return int(order.total)
+
+
+def record_order_points(order):
+    """Record the points award for a paid order, at most once per order."""
+    amount = points_for_order(order)
+    if amount <= 0:
+        return
+    PointsTransaction.objects.bulk_create(
+        [
+            PointsTransaction(
+                user_id=order.user_id,
+                order=order,
+                amount=amount,
+                reason=f"Order {order.order_number} payment",
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def apply_pending_points(batch_size=500):
+    """
+    Add pending transactions to user balances.
+    
+    Yields ``(transactions, users)`` per batch until no unclaimed pending
+    transactions remain.
+    """
+    while True:
+        with transaction.atomic():
+            pending = list(
+                PointsTransaction.objects.select_for_update(skip_locked=True)
+                .filter(applied_at__isnull=True)
+                .order_by('pk')
+                .values_list('pk', 'user_id', 'amount')[:batch_size]
+            )
+            if not pending:
+                return
+            
+            lock_balances()
+            totals = Counter()
+            for pk, user_id, amount in pending:
+                totals[user_id] += amount
+            # Users in id order so concurrent batches lock them in the same order.
+            for user_id in sorted(totals):
+                User.objects.filter(pk=user_id).update(
+                    points=Greatest(F('points') + totals[user_id], 0)
+                )
+            PointsTransaction.objects.filter(pk__in=[row[0] for row in pending]).update(
+                applied_at=timezone.now()
+            )
+        yield len(pending), len(totals)
+
+
+def rebuild_points_balances():
+    """
+    Recompute every balance from the ledger; returns the number of users updated.
+    
+    Waits for running ``apply_pending_points`` batches and holds off new ones
+    until it commits, so it is exact even while workers run. Pending
+    transactions are included and marked applied.
+    """
+    with transaction.atomic():
+        lock_balances(exclusive=True)
+        pending = list(
+            PointsTransaction.objects.select_for_update()
+            .filter(applied_at__isnull=True)
+            .values_list('pk', flat=True)
+        )
+        PointsTransaction.objects.filter(pk__in=pending).update(applied_at=timezone.now())
+        
+        applied = (
+            PointsTransaction.objects.filter(user=OuterRef('pk'), applied_at__isnull=False)
+            .order_by().values('user').annotate(total=Sum('amount')).values('total')
+        )
+        return User.objects.update(points=Greatest(Coalesce(Subquery(applied), 0), 0))
@@ -1,3 +1,78 @@
 from django.test import TestCase
+from django.utils import timezone
+from decimal import Decimal
+from orders.models import Order
+from outbox.dispatch import drain
+from .models import PointsTransaction, User
+from .points import apply_pending_points, rebuild_points_balances
 
-# Create your tests here.
+
+class PointsLedgerTest(TestCase):
+    """Test order points awards and the pending ledger."""
+    
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='testpass123')
+            for i in range(2)
+        ]
+        self.orders = [
+            Order.objects.create(
+                user=user, email=user.email, status='awaiting_payment',
+                subtotal=Decimal('40.00'), tax_amount=Decimal('2.50'), shipping_amount=Decimal('0.00'),
+                total=Decimal('42.50'),
+            )
+            for user in self.users
+        ]
+    
+    def pay(self, order):
+        order.status = 'paid'
+        order.save()
+        list(drain())
+    
+    def test_award_is_recorded_once_and_applied_by_worker(self):
+        order = self.orders[0]
+        self.pay(order)
+        self.pay(order)
+        order.status = 'shipped'
+        order.save()
+        list(drain())
+        
+        award = PointsTransaction.objects.get()
+        self.assertEqual((award.order, award.amount, award.applied_at), (order, 42, None))
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).points, 0)
+        
+        self.assertEqual(list(apply_pending_points()), [(1, 1)])
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).points, 42)
+        self.assertEqual(list(apply_pending_points()), [])
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).points, 42)
+    
+    def test_batches_update_each_user_once(self):
+        for order in self.orders:
+            self.pay(order)
+        self.users[0].add_points(8, 'Welcome bonus')
+        
+        # Claim, balance lock, one update per user, mark applied; then an empty claim ends the run.
+        with self.assertNumQueries(10):
+            self.assertEqual(list(apply_pending_points(batch_size=10)), [(2, 2)])
+        self.assertEqual(
+            list(User.objects.order_by('pk').values_list('points', flat=True)), [50, 42]
+        )
+    
+    def test_rebuild_recomputes_balances_from_ledger(self):
+        self.pay(self.orders[0])
+        self.users[1].add_points(5, 'Welcome bonus')
+        User.objects.update(points=1000)
+        
+        self.assertEqual(rebuild_points_balances(), 2)
+        self.assertEqual(
+            list(User.objects.order_by('pk').values_list('points', flat=True)), [42, 5]
+        )
+        self.assertFalse(PointsTransaction.objects.filter(applied_at__isnull=True).exists())
+    
+    def test_negative_ledger_total_is_clamped(self):
+        self.users[0].add_points(5, 'Welcome bonus')
+        PointsTransaction.objects.create(
+            user=self.users[0], amount=-20, reason='Redemption', applied_at=timezone.now()
+        )
+        self.assertEqual(rebuild_points_balances(), 2)
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).points, 0)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pageview',
+            index=models.Index(fields=['timestamp', 'id'], name='analytics_pageview_ts_id'),
+        ),
+    ]
@@ -121,6 +121,7 @@ class PageView(models.Model):
             models.Index(fields=['url']),
             models.Index(fields=['user']),
             models.Index(fields=['timestamp']),
+            models.Index(fields=['timestamp', 'id'], name='analytics_pageview_ts_id'),
         ]
     
     def __str__(self):
@@ -6,6 +6,7 @@ urlpatterns = [
     path('products/', views.ProductAnalyticsListView.as_view(), name='product-analytics-list'),
     path('customers/', views.CustomerAnalyticsListView.as_view(), name='customer-analytics-list'),
     path('categories/', views.CategoryAnalyticsListView.as_view(), name='category-analytics-list'),
+    path('page-views/', views.PageViewListView.as_view(), name='page-view-list'),
     path('summary/', views.analytics_summary, name='analytics-summary'),
     path('top-products/', views.top_products, name='top-products'),
     path('top-categories/', views.top_categories, name='top-categories'),
@@ -2,7 +2,7 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-from django.db.models import Sum, Count, Avg, Q
+from django.db.models import Sum, Count, Avg, Q, Prefetch
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import (
@@ -18,6 +18,8 @@ from .serializers import (
 from catalog.models import Product, Category
 from accounts.models import User
 from orders.models import Order
+from api.pagination import KeysetPagination
+from api.performance import cache_response, get_cache_ttl
 
 
 class SalesAnalyticsListView(generics.ListAPIView):
@@ -46,7 +48,9 @@ class ProductAnalyticsListView(generics.ListAPIView):
     permission_classes = [IsAdminUser]
     
     def get_queryset(self):
-        queryset = ProductAnalytics.objects.select_related('product')
+        queryset = ProductAnalytics.objects.prefetch_related(
+            Prefetch('product', queryset=Product.objects.select_related('category').with_listing_data())
+        )
         
         # Filter by product
         product_id = self.request.query_params.get('product_id')
@@ -115,6 +119,24 @@ class CategoryAnalyticsListView(generics.ListAPIView):
         return queryset
 
 
+class PageViewListView(generics.ListAPIView):
+    """List page views, newest first, with keyset pagination."""
+    serializer_class = PageViewSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-timestamp', '-id')
+    
+    def get_queryset(self):
+        queryset = PageView.objects.all()
+        
+        # Filter by url
+        url = self.request.query_params.get('url')
+        if url:
+            queryset = queryset.filter(url=url)
+            
+        return queryset
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def analytics_summary(request):
@@ -153,6 +175,7 @@ def analytics_summary(request):
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@cache_response('top_products', tags=['order:*', 'product:*'], timeout=get_cache_ttl('analytics_report'))
 def top_products(request):
     """Get top performing products."""
     days = int(request.query_params.get('days', 30))
@@ -161,7 +184,7 @@ def top_products(request):
     start_date = end_date - timedelta(days=days)
     
     # Get top products by revenue
-    products = Product.objects.annotate(
+    products = Product.objects.select_related('category').with_listing_data().annotate(
         revenue=Sum('order_items__line_total', filter=Q(order_items__order__created_at__date__range=[start_date, end_date])),
         orders=Count('order_items__order', filter=Q(order_items__order__created_at__date__range=[start_date, end_date])),
         views=Sum('analytics__views', filter=Q(analytics__date__range=[start_date, end_date]))
@@ -183,6 +206,7 @@ def top_products(request):
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@cache_response('top_categories', tags=['order:*', 'product:*', 'category:*'], timeout=get_cache_ttl('analytics_report'))
 def top_categories(request):
     """Get top performing categories."""
     days = int(request.query_params.get('days', 30))
@@ -212,6 +236,7 @@ def top_categories(request):
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@cache_response('revenue_trend', tags=['order:*'], timeout=get_cache_ttl('analytics_report'))
 def revenue_trend(request):
     """Get revenue trend data."""
     days = int(request.query_params.get('days', 30))
@@ -0,0 +1,48 @@
+"""
+Human-readable document numbers (orders, support tickets).
+
+Numbers come from Postgres sequences created with ``INCREMENT BY`` the block
+size: one ``nextval`` reserves a whole block, which the process then hands out
+locally, so most numbers cost no round trip. Numbers are unique without retries
+and increase over time, keeping inserts into the unique ``*_number`` indexes at
+the right edge of the B-tree. Blocks are per process, so numbers from several
+workers interleave and unused parts of a block are skipped on restart; both are
+harmless for identifiers.
+"""
+
+import os
+import threading
+from django.db import connection
+
+
+class BlockSequence:
+    """Thread-safe allocator for numbers from a block-incrementing sequence."""
+
+    def __init__(self, sequence, block_size):
+        self.sequence = sequence
+        self.block_size = block_size
+        self._next = self._limit = 0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _allocate(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT nextval(%s)', [self.sequence])
+            start = cursor.fetchone()[0]
+        self._next, self._limit = start, start + self.block_size
+        # A forked worker must not reuse its parent's block.
+        self._pid = os.getpid()
+
+    def next(self):
+        with self._lock:
+            if self._next >= self._limit or self._pid != os.getpid():
+                self._allocate()
+            value = self._next
+            self._next += 1
+            return value
+
+
+# Keep the sequence names and block sizes in sync with orders migration 0004
+# and support migration 0002.
+ORDER_NUMBERS = BlockSequence('orders_order_number_seq', 20)
+TICKET_NUMBERS = BlockSequence('support_ticket_number_seq', 20)
@@ -0,0 +1,150 @@
+"""
+Pagination classes shared across API views.
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import models
+from django.db.models import F, Func, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import NotFound, ValidationError as APIValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class RowValue(Func):
+    """SQL row constructor, e.g. ``ROW(created_at, id)``, for row-wise comparisons."""
+
+    function = 'ROW'
+    output_field = models.Field()
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on a unique composite key such as ``(created_at, id)``.
+
+    Each page is fetched with ``WHERE (created_at, id) < (last_created_at, last_id)``
+    so deep pages cost the same as the first one and no ``COUNT(*)`` is issued.
+    Views can override the key with a ``keyset_ordering`` attribute; all fields
+    must sort in the same direction and there should be a matching composite index.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, view):
+        ordering = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        if len({field.startswith('-') for field in ordering}) != 1:
+            raise ImproperlyConfigured('Keyset ordering fields must all sort in the same direction.')
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, values):
+        # Full-precision isoformat: DjangoJSONEncoder truncates datetimes to milliseconds.
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        payload = json.dumps(values, default=str).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    def decode_cursor(self, cursor, model, fields):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [model._meta.get_field(name).to_python(value) for name, value in zip(fields, values)]
+        except (binascii.Error, UnicodeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(view)
+        self.fields = [field.lstrip('-') for field in ordering]
+        descending = ordering[0].startswith('-')
+
+        queryset = queryset.order_by(*ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = self.decode_cursor(cursor, queryset.model, self.fields)
+            lookup = LessThan if descending else GreaterThan
+            queryset = queryset.filter(lookup(
+                RowValue(*[F(name) for name in self.fields]),
+                RowValue(*[Value(value) for value in values]),
+            ))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_values = (
+            [getattr(results[-1], name) for name in self.fields]
+            if self.has_next else None
+        )
+        return results
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_values))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PageNumberOrKeysetPagination(BasePagination):
+    """
+    Page-number pagination by default, keyset pagination when the request
+    carries a ``cursor`` parameter (an empty ``?cursor=`` starts at page one).
+
+    Keyset mode always sorts by the view's keyset ordering, so a request that
+    also asks for an ``ordering`` is rejected rather than silently reordered.
+    """
+
+    ordering_query_param = api_settings.ORDERING_PARAM
+    ordering_with_cursor_message = 'ordering cannot be combined with cursor pagination'
+
+    def __init__(self):
+        self.page_number = PageNumberPagination()
+        self.keyset = KeysetPagination()
+        self.active = self.page_number
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset.cursor_query_param in request.query_params:
+            if request.query_params.get(self.ordering_query_param):
+                raise APIValidationError({self.ordering_query_param: [self.ordering_with_cursor_message]})
+            self.active = self.keyset
+        else:
+            self.active = self.page_number
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number.get_paginated_response_schema(schema)
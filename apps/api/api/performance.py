@@ -2,10 +2,14 @@
 Performance optimization configurations and utilities.
 """
 
+from functools import wraps
 from django.core.cache import cache
-from django.db import connection
+from django.db import connection, models, transaction
+from django.db.models.signals import post_save, post_delete
 from django.conf import settings
+from rest_framework.response import Response
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -44,15 +48,21 @@ class DatabasePerformanceMiddleware:
 def cache_key_generator(view_name, *args, **kwargs):
     """Generate cache keys for API views."""
     key_parts = [view_name]
+    request = kwargs.pop('request', None)
+    
+    # Add URL arguments
+    key_parts.extend(args)
+    for key, value in sorted(kwargs.items()):
+        key_parts.append(f"{key}_{value}")
     
     # Add user ID if authenticated
-    if hasattr(kwargs.get('request'), 'user') and kwargs['request'].user.is_authenticated:
-        key_parts.append(f"user_{kwargs['request'].user.id}")
+    if hasattr(request, 'user') and request.user.is_authenticated:
+        key_parts.append(f"user_{request.user.id}")
     
     # Add query parameters
-    if hasattr(kwargs.get('request'), 'GET'):
-        for key, value in sorted(kwargs['request'].GET.items()):
-            key_parts.append(f"{key}_{value}")
+    if hasattr(request, 'GET'):
+        for key, values in sorted(request.GET.lists()):
+            key_parts.append(f"{key}_{','.join(values)}")
     
     return ":".join(str(part) for part in key_parts)
 
@@ -65,23 +75,156 @@ def get_cache_ttl(view_name):
         'category_list': 1800,    # 30 minutes
         'user_profile': 60,       # 1 minute
         'cart_detail': 30,        # 30 seconds
+        'cart_snapshot': 3600,    # 1 hour
         'order_list': 120,        # 2 minutes
+        'order_detail': 120,      # 2 minutes
+        'analytics_report': 300,  # 5 minutes
     }
     return ttl_map.get(view_name, 60)  # Default 1 minute
 
 
+# Tagged caching
+#
+# Every tag (``product:42`` for one row, ``product:*`` for any row of a model)
+# has a version stored in the shared cache. Cached values record the versions
+# of their tags when they were computed and are only served while all of them
+# are unchanged, so invalidating a tag is a single write and no key registry
+# or SCAN is needed: stale entries are never read again and expire on their own.
+
+def model_tag(model, pk=None):
+    """Tag for a model instance (``product:42``) or a whole model (``product:*``)."""
+    if pk is None and isinstance(model, models.Model):
+        pk = model.pk
+    return f"{model._meta.model_name}:{'*' if pk is None else pk}"
+
+
+# Tag versions outlive any cached response. An expired version only makes the
+# entries tagged with it miss, so this bounds memory without risking staleness.
+TAG_TIMEOUT = 60 * 60 * 24  # 1 day
+
+
+def _tag_key(tag):
+    return f"tag:{tag}"
+
+
+def get_tag_versions(tags):
+    """Current version of each tag, creating versions for unseen tags."""
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, tag in keys.items():
+        if key not in found:
+            # Seed from the clock so an evicted tag never reuses an old version.
+            cache.add(key, time.time_ns(), timeout=TAG_TIMEOUT)
+            found[key] = cache.get(key)
+        versions[tag] = found[key]
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Invalidate every cached value tagged with any of ``tags``."""
+    now = time.time_ns()
+    cache.set_many({_tag_key(tag): now for tag in tags}, timeout=TAG_TIMEOUT)
+
+
+def get_tagged(key):
+    """Return a tagged cached value, or None if it is missing or any tag changed."""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    current = cache.get_many([_tag_key(tag) for tag in entry['tags']])
+    for tag, version in entry['tags'].items():
+        if current.get(_tag_key(tag)) != version:
+            return None
+    return entry['value']
+
+
+def set_tagged(key, value, tag_versions, timeout=None):
+    """
+    Cache a value against tag versions from ``get_tag_versions``.
+    
+    Read the versions before computing the value so that a concurrent
+    invalidation always leaves the entry stale rather than the other way round.
+    """
+    cache.set(key, {'value': value, 'tags': tag_versions}, timeout)
+
+
 def invalidate_related_cache(model_instance, related_models=None):
-    """Invalidate cache for related models."""
+    """Invalidate cache for a model instance and related models or instances."""
     if related_models is None:
         related_models = []
     
-    # Clear model-specific cache
-    model_name = model_instance._meta.model_name
-    cache_pattern = f"{model_name}_*"
+    tags = [model_tag(model_instance), model_tag(type(model_instance))]
+    for related in related_models:
+        tags.append(model_tag(related))
+        if isinstance(related, models.Model):
+            tags.append(model_tag(type(related)))
+    
+    logger.debug(f"Invalidating cache tags: {', '.join(tags)}")
+    invalidate_tags(*tags)
+
+
+def invalidate_on_change(model, related=None, own_tags=True):
+    """
+    Invalidate a model's tags on save/delete.
+    
+    ``related`` names foreign keys whose targets are invalidated too, e.g.
+    ``invalidate_on_change(OrderItem, related=['order'])`` bumps ``order:<order_id>``.
+    With ``own_tags=False`` only those related tags are bumped, for models whose
+    own tags no cached response depends on.
+    """
+    related = related or []
+    
+    def handler(sender, instance, **kwargs):
+        tags = [model_tag(instance), model_tag(sender)] if own_tags else []
+        for name in related:
+            field = sender._meta.get_field(name)
+            target_id = getattr(instance, field.attname)
+            tags.append(model_tag(field.related_model))
+            if target_id is not None:
+                tags.append(model_tag(field.related_model, target_id))
+        # Bump now for readers inside this transaction and again after commit
+        # so a concurrent read of pre-commit data is not cached as current.
+        invalidate_tags(*tags)
+        transaction.on_commit(lambda: invalidate_tags(*tags))
+    
+    uid = f"invalidate_tags:{model._meta.label}"
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+def cache_response(view_name, tags, timeout=None):
+    """
+    Cache successful GET responses of a view, invalidated by tags.
+    
+    ``tags`` is a list of tags or a callable ``(request, *args, **kwargs)``
+    returning one. Keys come from ``cache_key_generator``, so responses are
+    per user and per query string. Decorate ``@api_view`` functions directly
+    (below the DRF decorators) and class-based views with ``method_decorator``.
+    """
+    config = get_cache_config('api_responses')
+    if timeout is None:
+        timeout = get_cache_ttl(view_name)
     
-    # This is a simplified version - in production, you'd use Redis SCAN
-    # or maintain a cache key registry
-    logger.info(f"Invalidating cache for {model_name}")
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+            
+            key = f"{config['key_prefix']}:{cache_key_generator(view_name, *args, request=request, **kwargs)}"
+            data = get_tagged(key)
+            if data is not None:
+                return Response(data)
+            
+            entry_tags = tags(request, *args, **kwargs) if callable(tags) else tags
+            tag_versions = get_tag_versions(entry_tags)
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                set_tagged(key, response.data, tag_versions, timeout)
+            return response
+        return wrapper
+    return decorator
 
 
 # Database optimization queries
@@ -107,7 +250,6 @@ OPTIMIZATION_QUERIES = [
     # Cart indexes
     "CREATE INDEX IF NOT EXISTS idx_cart_user ON cart_cart (user_id);",
     "CREATE INDEX IF NOT EXISTS idx_cart_session ON cart_cart (session_key);",
-    "CREATE INDEX IF NOT EXISTS idx_cart_updated ON cart_cart (updated_at);",
     
     # Inventory indexes
     "CREATE INDEX IF NOT EXISTS idx_stock_movement_variant ON inventory_stockmovement (variant_id);",
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'django_filters',
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
     'analytics',
     'storages',
     'feature_flags',
+    'outbox',
 ]
 
 MIDDLEWARE = [
@@ -89,6 +91,43 @@ DATABASES = {
     }
 }
 
+# Cache
+# ``default`` is shared between processes (Redis when REDIS_URL is set);
+# ``local`` is a per-process memory cache for small, hot, versioned data.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'local',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+# Guest carts live in a key-value store until login (see cart.storage)
+CART_GUEST_STORE = os.environ.get('CART_GUEST_STORE', 'cart.storage.CacheGuestCartStore')
+CART_GUEST_CACHE = 'default'
+CART_GUEST_TTL = 60 * 60 * 24 * 7  # 7 days
+
+# Carts idle this long are deleted by the purge_stale_carts command
+CART_STALE_AGE = 60 * 60 * 24 * 30  # 30 days
+
+# Stock held for unpaid orders is released after this long (see inventory.stock)
+STOCK_RESERVATION_TTL = 60 * 30  # 30 minutes
+
+# Checkout Idempotency-Keys are honoured for this long, then purged by purge_checkout_keys
+CHECKOUT_IDEMPOTENCY_TTL = 60 * 60 * 24  # 24 hours
+
+# Outbox messages are marked failed after this many delivery attempts (see outbox.dispatch)
+OUTBOX_MAX_ATTEMPTS = 8
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -14,7 +14,7 @@ class CartAdmin(admin.ModelAdmin):
     list_filter = ['created_at', 'updated_at']
     search_fields = ['user__email', 'session_key']
     inlines = [CartItemInline]
-    readonly_fields = ['subtotal', 'tax_amount', 'total', 'total_items']
+    readonly_fields = ['subtotal', 'tax_amount', 'total', 'total_items', 'item_count', 'cached_subtotal']
     
     def get_queryset(self, request):
         return super().get_queryset(request).prefetch_related('items__variant')
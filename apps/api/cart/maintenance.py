@@ -0,0 +1,73 @@
+"""
+Stale cart cleanup.
+
+Abandoned carts (mostly session carts) are deleted in bounded batches, oldest
+``updated_at`` first. Each batch is one statement: it claims up to
+``batch_size`` carts with ``FOR UPDATE SKIP LOCKED`` (so carts being written
+to are left for a later pass) and deletes them together with the rows that
+cascade from them (items, order drafts). Locks are held only for that
+statement, so the purge can run continuously next to live traffic.
+
+``Cart.updated_at`` is bumped by every item write (see ``Cart.adjust_summary``),
+so it reflects the last activity on the cart.
+"""
+
+from datetime import timedelta
+from django.db import connection, models
+from django.utils import timezone
+from .models import Cart
+
+
+def _cascade_tables():
+    """``(table, column)`` for every foreign key that cascades from Cart."""
+    return [
+        (rel.related_model._meta.db_table, rel.field.column)
+        for rel in Cart._meta.related_objects
+        if rel.one_to_many and rel.on_delete is models.CASCADE
+    ]
+
+
+def purge_stale_carts(max_age, batch_size=500, include_user_carts=False):
+    """
+    Delete carts not updated for ``max_age`` (a timedelta or seconds).
+    
+    Yields ``(carts, related_rows)`` per batch until no stale unlocked carts
+    remain. Only anonymous (session) carts are purged unless
+    ``include_user_carts`` is set.
+    """
+    if not isinstance(max_age, timedelta):
+        max_age = timedelta(seconds=max_age)
+    cutoff = timezone.now() - max_age
+    table = Cart._meta.db_table
+    owner_filter = '' if include_user_carts else 'AND user_id IS NULL'
+    
+    deletes = []
+    for index, (related_table, column) in enumerate(_cascade_tables()):
+        deletes.append(
+            f"related_{index} AS (DELETE FROM {related_table} "
+            f"WHERE {column} IN (SELECT id FROM stale) RETURNING 1)"
+        )
+    related_count = ' + '.join(
+        f'(SELECT count(*) FROM related_{index})' for index in range(len(deletes))
+    ) or '0'
+    
+    sql = f"""
+        WITH stale AS (
+            SELECT id FROM {table}
+            WHERE updated_at < %s {owner_filter}
+            ORDER BY updated_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        ),
+        {''.join(delete + ', ' for delete in deletes)}
+        carts AS (DELETE FROM {table} WHERE id IN (SELECT id FROM stale) RETURNING 1)
+        SELECT (SELECT count(*) FROM carts), {related_count}
+    """
+    
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [cutoff, batch_size])
+            carts, related_rows = cursor.fetchone()
+        if not carts:
+            return
+        yield carts, related_rows
@@ -0,0 +1,69 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from cart.maintenance import purge_stale_carts
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned carts and their items in batches'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=float,
+            default=settings.CART_STALE_AGE / 86400,
+            help='Delete carts not updated for this many days (default: settings.CART_STALE_AGE)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of carts to delete per statement (default: 500)'
+        )
+        parser.add_argument(
+            '--include-user-carts',
+            action='store_true',
+            help='Also delete stale carts that belong to a user',
+        )
+        parser.add_argument(
+            '--continuous',
+            action='store_true',
+            help='Keep running, sleeping between passes',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=60,
+            help='Seconds to sleep between passes in continuous mode (default: 60)'
+        )
+    
+    def handle(self, *args, **options):
+        while True:
+            self.purge(options)
+            if not options['continuous']:
+                return
+            time.sleep(options['sleep'])
+    
+    def purge(self, options):
+        started = time.monotonic()
+        total_carts = total_rows = 0
+        
+        batches = purge_stale_carts(
+            max_age=options['days'] * 86400,
+            batch_size=options['batch_size'],
+            include_user_carts=options['include_user_carts'],
+        )
+        for carts, related_rows in batches:
+            total_carts += carts
+            total_rows += related_rows
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Deleted {carts} carts and {related_rows} related rows')
+        
+        elapsed = time.monotonic() - started
+        rate = total_carts / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Purged {total_carts} stale carts and {total_rows} related rows '
+                f'in {elapsed:.1f}s ({rate:.0f} carts/s)'
+            )
+        )
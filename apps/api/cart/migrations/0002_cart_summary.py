@@ -0,0 +1,38 @@
+# Generated by Django 4.2.24 on 2026-10-17 07:35
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+BACKFILL_SQL = """
+UPDATE cart_cart c
+SET item_count = s.item_count, cached_subtotal = s.subtotal
+FROM (
+    SELECT i.cart_id, SUM(i.quantity) AS item_count, SUM(i.quantity * v.price) AS subtotal
+    FROM cart_cartitem i
+    JOIN catalog_productvariant v ON v.id = i.variant_id
+    GROUP BY i.cart_id
+) s
+WHERE c.id = s.cart_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='cached_subtotal',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Denormalized subtotal at add-time prices, adjusted with F() on CartItem writes', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Denormalized total quantity, adjusted with F() on CartItem writes'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
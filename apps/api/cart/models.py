@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 from catalog.models import ProductVariant
 from accounts.models import User
+from .pricing import calculate_cart_totals
 
 
 class Cart(models.Model):
@@ -16,14 +20,30 @@ class Cart(models.Model):
         related_name='carts'
     )
     session_key = models.CharField(max_length=40, null=True, blank=True)
+    item_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Denormalized total quantity, adjusted with F() on CartItem writes'
+    )
+    cached_subtotal = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text='Denormalized subtotal at add-time prices, adjusted with F() on CartItem writes'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Maintained by CartItem writes; never written back from a (possibly stale) instance.
+    SUMMARY_FIELDS = ('item_count', 'cached_subtotal')
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['session_key']),
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
@@ -31,35 +51,117 @@ class Cart(models.Model):
             return f"Cart for {self.user.email}"
         return f"Cart for session {self.session_key}"
     
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SUMMARY_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def adjust_summary(cls, cart_id, quantity, amount):
+        """Atomically add a quantity/amount delta to a cart's summary columns."""
+        cls.objects.filter(pk=cart_id).update(
+            item_count=Greatest(F('item_count') + quantity, 0),
+            cached_subtotal=Greatest(F('cached_subtotal') + amount, Decimal('0.00')),
+            updated_at=timezone.now(),
+        )
+    
+    @classmethod
+    def recompute_summary(cls, cart_ids):
+        """
+        Rewrite the summary columns of carts from their lines in one UPDATE.
+        
+        Used after deletes: the removed lines' add-time prices are unknown, so
+        the remaining lines are re-summed at current prices.
+        """
+        lines = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        cls.objects.filter(pk__in=cart_ids).update(
+            item_count=Coalesce(Subquery(lines.annotate(total=Sum('quantity')).values('total')), 0),
+            cached_subtotal=Coalesce(
+                Subquery(lines.annotate(total=Sum(
+                    F('quantity') * F('variant__price'), output_field=DecimalField(max_digits=12, decimal_places=2)
+                )).values('total')),
+                Decimal('0.00'),
+            ),
+            updated_at=timezone.now(),
+        )
+    
+    def sync_summary(self):
+        """Rewrite the summary columns from live totals if they have drifted."""
+        totals = self.get_totals()
+        if (self.item_count, self.cached_subtotal) != (totals.item_count, totals.subtotal):
+            Cart.objects.filter(pk=self.pk).update(
+                item_count=totals.item_count, cached_subtotal=totals.subtotal
+            )
+            self.item_count, self.cached_subtotal = totals.item_count, totals.subtotal
+    
+    def clear(self):
+        """Delete all items; the line delete zeroes the summary columns with it."""
+        deleted, _ = self.items.all().delete()
+        if not deleted:
+            # Nothing to delete, but the columns may still have drifted.
+            Cart.recompute_summary([self.pk])
+        self.item_count, self.cached_subtotal = 0, Decimal('0.00')
+        self.invalidate_totals()
+    
+    # Memoized CartTotals, see get_totals()
+    _totals = None
+    
+    def get_totals(self):
+        """Get subtotal, tax, total and item count, computed once per instance."""
+        if self._totals is None:
+            self._totals = calculate_cart_totals(self)
+        return self._totals
+    
+    def invalidate_totals(self):
+        """Drop memoized totals after the cart's lines change."""
+        self._totals = None
+    
+    def refresh_from_db(self, *args, **kwargs):
+        self.invalidate_totals()
+        super().refresh_from_db(*args, **kwargs)
+    
     @property
     def total_items(self):
         """Get total number of items in cart."""
-        return sum(item.quantity for item in self.items.all())
+        return self.get_totals().item_count
     
     @property
     def subtotal(self):
         """Calculate subtotal before tax."""
-        return sum(item.line_total for item in self.items.all())
+        return self.get_totals().subtotal
     
     @property
     def tax_amount(self):
         """Calculate tax amount (simplified 10% tax)."""
-        return self.subtotal * Decimal('0.10')
+        return self.get_totals().tax_amount
     
     @property
     def total(self):
         """Calculate total including tax."""
-        return self.subtotal + self.tax_amount
+        return self.get_totals().total
     
     @property
     def totals(self):
         """Get all totals as a dictionary."""
-        return {
-            'subtotal': float(self.subtotal),
-            'tax_amount': float(self.tax_amount),
-            'total': float(self.total),
-            'item_count': self.total_items,
-        }
+        return self.get_totals().as_dict()
+
+
+class CartItemQuerySet(models.QuerySet):
+    
+    def delete(self):
+        """Delete the lines and recompute the summary of the carts they were in."""
+        with transaction.atomic(savepoint=False):
+            cart_ids = set(self.values_list('cart_id', flat=True))
+            result = super().delete()
+            if cart_ids:
+                Cart.recompute_summary(cart_ids)
+        return result
+    
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class CartItem(models.Model):
@@ -74,6 +176,8 @@ class CartItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CartItemQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['cart', 'variant']
         ordering = ['created_at']
@@ -105,6 +209,86 @@ class CartItem(models.Model):
                 f'Requested: {self.quantity}'
             )
     
+    # Quantity as last read from or written to the database.
+    _saved_quantity = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_quantity = instance.__dict__.get('quantity')
+        return instance
+    
+    def _get_saved_quantity(self):
+        if self._state.adding:
+            return 0
+        if self._saved_quantity is None:
+            self._saved_quantity = (
+                CartItem.objects.filter(pk=self.pk).values_list('quantity', flat=True).first() or 0
+            )
+        return self._saved_quantity
+    
+    def _invalidate_cart_totals(self):
+        # Only a cart instance already loaded on this item can hold stale totals.
+        cart = self._state.fields_cache.get('cart')
+        if cart is not None:
+            cart.invalidate_totals()
+    
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        delta = self.quantity - self._get_saved_quantity()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if delta:
+                Cart.adjust_summary(self.cart_id, delta, self.variant.price * delta)
+        self._saved_quantity = self.quantity
+        self._invalidate_cart_totals()
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Cart.recompute_summary([self.cart_id])
+        self._invalidate_cart_totals()
+        return result
+    
+    @classmethod
+    def add_quantity(cls, cart_id, variant, quantity):
+        """
+        Atomically add ``quantity`` of a variant to a cart line.
+        
+        A single ``INSERT ... ON CONFLICT DO UPDATE`` creates the line or
+        increments it in SQL, and only if the variant is active and the new
+        quantity fits its current stock. Returns the saved line, or ``None``
+        if the stock or active check failed. Concurrent adds serialize on the
+        row instead of losing updates or hitting the unique constraint.
+        """
+        table = cls._meta.db_table
+        variant_table = ProductVariant._meta.db_table
+        now = timezone.now()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} AS line (cart_id, variant_id, quantity, created_at, updated_at)
+                    SELECT %s, v.id, %s, %s, %s FROM {variant_table} v
+                    WHERE v.id = %s AND v.is_active
+                        AND (NOT v.track_inventory OR v.stock_quantity >= %s)
+                    ON CONFLICT (cart_id, variant_id) DO UPDATE
+                    SET quantity = line.quantity + EXCLUDED.quantity, updated_at = EXCLUDED.updated_at
+                    WHERE (
+                        SELECT NOT v.track_inventory OR v.stock_quantity >= line.quantity + EXCLUDED.quantity
+                        FROM {variant_table} v WHERE v.id = line.variant_id
+                    )
+                    RETURNING id, cart_id, variant_id, quantity, created_at, updated_at
+                    """,
+                    [cart_id, quantity, now, now, variant.pk, quantity],
+                )
+                row = cursor.fetchone()
+            if row is None:
+                return None
+            Cart.adjust_summary(cart_id, quantity, variant.price * quantity)
+        
+        item = cls.from_db(
+            connection.alias, ['id', 'cart_id', 'variant_id', 'quantity', 'created_at', 'updated_at'], row
+        )
+        item.variant = variant
+        return item
@@ -0,0 +1,66 @@
+"""
+Cart pricing.
+
+Totals are computed in one pass: from the cart's prefetched lines when they are
+already loaded (e.g. by CartView), otherwise with a single
+``SUM(price * quantity)`` aggregate. ``Cart.get_totals`` memoizes the result on
+the cart instance, so every total read during a request shares one computation.
+"""
+
+from collections import namedtuple
+from decimal import Decimal
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+TAX_RATE = Decimal('0.10')  # simplified flat tax
+
+
+class CartTotals(namedtuple('CartTotals', ['subtotal', 'tax_amount', 'total', 'item_count'])):
+    """Cart totals; ``as_dict`` is the API representation."""
+    
+    def as_dict(self):
+        return {
+            'subtotal': float(self.subtotal),
+            'tax_amount': float(self.tax_amount),
+            'total': float(self.total),
+            'item_count': self.item_count,
+        }
+
+
+def _prefetched_items(cart):
+    """Cart lines if they and their variants are already loaded, else None."""
+    items = getattr(cart, '_prefetched_objects_cache', {}).get('items')
+    if items is None or not all(item._state.fields_cache.get('variant') for item in items):
+        return None
+    return items
+
+
+def _make_totals(subtotal, item_count):
+    tax_amount = subtotal * TAX_RATE
+    return CartTotals(subtotal, tax_amount, subtotal + tax_amount, item_count)
+
+
+def calculate_item_totals(items):
+    """Compute totals for loaded cart lines (variants must be loaded)."""
+    subtotal = sum((item.variant.price * item.quantity for item in items), Decimal('0.00'))
+    return _make_totals(subtotal, sum(item.quantity for item in items))
+
+
+def calculate_line_totals(lines):
+    """Compute totals for ``(price, quantity)`` pairs."""
+    lines = list(lines)
+    subtotal = sum((price * quantity for price, quantity in lines), Decimal('0.00'))
+    return _make_totals(subtotal, sum(quantity for price, quantity in lines))
+
+
+def calculate_cart_totals(cart):
+    """Compute subtotal, tax, total and item count for a cart."""
+    items = _prefetched_items(cart)
+    if items is not None:
+        return calculate_item_totals(items)
+
+    line_total = ExpressionWrapper(
+        F('variant__price') * F('quantity'),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    result = cart.items.order_by().aggregate(subtotal=Sum(line_total), item_count=Sum('quantity'))
+    return _make_totals(result['subtotal'] or Decimal('0.00'), result['item_count'] or 0)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from decimal import Decimal
+from django.core.exceptions import ValidationError as DjangoValidationError
 from .models import Cart, CartItem
+from catalog.models import ProductVariant
 from catalog.serializers import ProductVariantSerializer
 
 
@@ -19,38 +21,52 @@ class CartItemSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
-    def validate_quantity(self, value):
-        """Validate quantity against stock."""
-        variant_id = self.initial_data.get('variant_id')
-        if variant_id:
-            from catalog.models import ProductVariant
-            try:
-                variant = ProductVariant.objects.get(id=variant_id)
-                if variant.track_inventory and value > variant.stock_quantity:
-                    raise serializers.ValidationError(
-                        f'Not enough stock. Available: {variant.stock_quantity}'
-                    )
-            except ProductVariant.DoesNotExist:
-                raise serializers.ValidationError('Invalid product variant')
-        return value
+    def validate(self, attrs):
+        """Validate quantity against stock, keeping the variant for create()."""
+        quantity = attrs.get('quantity', 1)
+        try:
+            variant = ProductVariant.objects.select_related('product').get(id=attrs['variant_id'])
+        except ProductVariant.DoesNotExist:
+            raise serializers.ValidationError({'quantity': 'Invalid product variant'})
+        cart = self.context['cart']
+        if cart.id is None:
+            # Database lines are checked by the upsert; guest lines only here.
+            if not variant.is_active:
+                raise serializers.ValidationError({'variant_id': 'Cannot add inactive product variant to cart'})
+            quantity += cart.get_lines().get(variant.id, 0)
+        if variant.track_inventory and quantity > variant.stock_quantity:
+            raise serializers.ValidationError({
+                'quantity': f'Not enough stock. Available: {variant.stock_quantity}'
+            })
+        attrs['variant'] = variant
+        return attrs
     
     def create(self, validated_data):
         """Create or update cart item."""
         variant_id = validated_data.pop('variant_id')
-        quantity = validated_data.get('quantity')
+        variant = validated_data.pop('variant')
+        quantity = validated_data.get('quantity', 1)
         
         # Get or create cart
         cart = self.context['cart']
+        if cart.id is None:
+            # Guest carts live in the guest cart store, not the database.
+            try:
+                return cart.add(variant_id, quantity, variant=variant)
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError({'quantity': exc.messages})
         
-        # Check if item already exists
-        try:
-            cart_item = CartItem.objects.get(cart=cart, variant_id=variant_id)
-            cart_item.quantity += quantity
-            cart_item.save()
-            return cart_item
-        except CartItem.DoesNotExist:
-            validated_data['variant_id'] = variant_id
-            return CartItem.objects.create(cart=cart, **validated_data)
+        cart_item = CartItem.add_quantity(cart.id, variant, quantity)
+        if cart_item is None:
+            if not variant.is_active:
+                raise serializers.ValidationError({'variant_id': 'Cannot add inactive product variant to cart'})
+            in_cart = cart.items.filter(variant=variant).values_list('quantity', flat=True).first() or 0
+            raise serializers.ValidationError({
+                'quantity': f'Not enough stock. Available: {variant.stock_quantity}, In cart: {in_cart}'
+            })
+        
+        cart.invalidate_totals()
+        return cart_item
 
 
 class CartSerializer(serializers.ModelSerializer):
@@ -67,6 +83,35 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class CartSnapshotLineSerializer(serializers.Serializer):
+    """Compact cart line: current price and stock without the full variant."""
+    
+    variant_id = serializers.IntegerField()
+    name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    stock_quantity = serializers.IntegerField()
+    is_in_stock = serializers.BooleanField()
+    is_available = serializers.BooleanField()
+    version = serializers.CharField()
+
+
+class CartSnapshotSerializer(serializers.Serializer):
+    """
+    Compact cart for polling.
+    
+    When ``since`` is set, ``lines`` only holds lines changed after that
+    version and ``removed`` the variant ids of lines deleted since.
+    """
+    
+    version = serializers.CharField()
+    since = serializers.CharField(allow_null=True)
+    lines = CartSnapshotLineSerializer(many=True)
+    removed = serializers.ListField(child=serializers.IntegerField())
+    totals = serializers.DictField()
+
+
 class CartUpdateSerializer(serializers.Serializer):
     """Serializer for updating cart item quantities."""
     
@@ -80,3 +125,115 @@ class CartUpdateSerializer(serializers.Serializer):
                 f'Not enough stock. Available: {cart_item.variant.stock_quantity}'
             )
         return value
+
+
+class CartOperationSerializer(serializers.Serializer):
+    """A single add/set/remove operation in a bulk cart update."""
+    
+    op = serializers.ChoiceField(choices=['add', 'set', 'remove'])
+    variant_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, default=1)
+    
+    def validate(self, attrs):
+        if attrs['op'] == 'add' and attrs['quantity'] < 1:
+            raise serializers.ValidationError({'quantity': 'Must be at least 1 when adding.'})
+        return attrs
+
+
+class CartBulkSerializer(serializers.Serializer):
+    """
+    Apply a list of cart operations at once.
+    
+    Operations are applied in order to the current quantities, then every
+    changed line is checked against one ``id__in`` fetch of its variants and
+    written with a single upsert. Stock shortfalls are collected in
+    ``validated_data['out_of_stock_items']`` rather than raised, so every one
+    can be reported. Run ``is_valid`` and ``save`` in one transaction:
+    database cart lines are locked while validating.
+    """
+    
+    MAX_OPERATIONS = 100
+    
+    operations = CartOperationSerializer(many=True, allow_empty=False)
+    
+    def validate_operations(self, value):
+        if len(value) > self.MAX_OPERATIONS:
+            raise serializers.ValidationError(f'At most {self.MAX_OPERATIONS} operations per request.')
+        return value
+    
+    def validate(self, attrs):
+        cart = self.context['cart']
+        variant_ids = {operation['variant_id'] for operation in attrs['operations']}
+        current = dict(
+            cart.items.select_for_update().filter(variant_id__in=variant_ids)
+            .values_list('variant_id', 'quantity')
+        )
+        
+        quantities = dict(current)
+        for operation in attrs['operations']:
+            variant_id = operation['variant_id']
+            if operation['op'] == 'add':
+                quantities[variant_id] = quantities.get(variant_id, 0) + operation['quantity']
+            elif operation['op'] == 'set':
+                quantities[variant_id] = operation['quantity']
+            else:
+                quantities[variant_id] = 0
+        changes = {
+            variant_id: quantity for variant_id, quantity in quantities.items()
+            if variant_id in variant_ids and quantity != current.get(variant_id, 0)
+        }
+        
+        variants = ProductVariant.objects.select_related('product').in_bulk(list(changes))
+        errors, out_of_stock_items = [], []
+        for variant_id, quantity in changes.items():
+            variant = variants.get(variant_id)
+            if quantity == 0:
+                continue
+            if variant is None:
+                errors.append(f'Invalid product variant: {variant_id}')
+            elif not variant.is_active:
+                errors.append(f'Cannot add inactive product variant to cart: {variant_id}')
+            elif variant.track_inventory and quantity > variant.stock_quantity:
+                out_of_stock_items.append({
+                    'variant_id': variant_id,
+                    'name': variant.display_name,
+                    'requested': quantity,
+                    'available': variant.stock_quantity,
+                })
+        if errors:
+            raise serializers.ValidationError({'operations': errors})
+        
+        attrs.update(
+            current=current, changes=changes, variants=variants, out_of_stock_items=out_of_stock_items
+        )
+        return attrs
+    
+    def create(self, validated_data):
+        cart = self.context['cart']
+        current, changes = validated_data['current'], validated_data['changes']
+        variants = validated_data['variants']
+        
+        upserts = [
+            CartItem(cart=cart, variant=variants[variant_id], quantity=quantity)
+            for variant_id, quantity in changes.items() if quantity
+        ]
+        removed = [variant_id for variant_id, quantity in changes.items() if not quantity]
+        if upserts:
+            CartItem.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['cart', 'variant'],
+                update_fields=['quantity', 'updated_at'],
+            )
+        if removed:
+            # Runs after the upserts, so the recomputed summary covers them too.
+            cart.items.filter(variant_id__in=removed).delete()
+        else:
+            quantity_delta = sum(quantity - current.get(variant_id, 0) for variant_id, quantity in changes.items())
+            amount_delta = sum(
+                (quantity - current.get(variant_id, 0)) * variants[variant_id].price
+                for variant_id, quantity in changes.items()
+            )
+            Cart.adjust_summary(cart.id, quantity_delta, amount_delta)
+        cart.invalidate_totals()
+        return cart
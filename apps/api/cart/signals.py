@@ -0,0 +1,26 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from catalog.models import ProductVariant
+from .models import Cart, CartItem
+from .storage import merge_guest_cart
+
+
+@receiver(user_logged_in)
+def merge_guest_cart_on_login(sender, request, user, **kwargs):
+    """Persist the session's guest cart into the user's cart on login."""
+    if request is not None and hasattr(request, 'session'):
+        merge_guest_cart(request, user)
+
+
+
+@receiver(pre_delete, sender=ProductVariant)
+def remember_carts_holding_variant(sender, instance, **kwargs):
+    # Cascaded CartItem deletes bypass CartItem.delete and the queryset delete.
+    instance._cart_ids = set(CartItem.objects.filter(variant=instance).values_list('cart_id', flat=True))
+
+
+@receiver(post_delete, sender=ProductVariant)
+def recompute_carts_holding_variant(sender, instance, **kwargs):
+    if getattr(instance, '_cart_ids', None):
+        Cart.recompute_summary(instance._cart_ids)
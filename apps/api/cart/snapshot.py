@@ -0,0 +1,103 @@
+"""
+Cart snapshots for cheap polling.
+
+A snapshot is the cart reduced to what the cart page needs to revalidate:
+quantity, current price, stock and availability per line, read with one narrow
+query instead of serializing full variants. Each line gets a version (a hash
+of those values and the variant/product ``updated_at``) and the cart version is
+a hash of its line versions.
+
+The ``{variant_id: line_version}`` map of every served version is kept in the
+shared cache for a while, so a client that sends back the version it last saw
+only receives the lines that changed since and the ids of removed lines. If
+that version has expired or is unknown, the full cart is returned.
+"""
+
+import hashlib
+from django.core.cache import caches
+from api.performance import get_cache_ttl
+from catalog.models import ProductVariant
+from .models import CartItem
+from .pricing import calculate_line_totals
+
+SNAPSHOT_KEY_PREFIX = 'cart:snapshot'
+
+VARIANT_FIELDS = [
+    'sku', 'name', 'product__name', 'price', 'stock_quantity',
+    'track_inventory', 'is_active', 'updated_at', 'product__updated_at',
+]
+
+
+def _digest(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def _make_line(variant_id, variant, quantity):
+    """Build a snapshot line from a ``values()`` row of ``VARIANT_FIELDS``."""
+    line = {
+        'variant_id': variant_id,
+        'name': f"{variant['product__name']} - {variant['name'] or variant['sku']}",
+        'quantity': quantity,
+        'price': variant['price'],
+        'line_total': variant['price'] * quantity,
+        'stock_quantity': variant['stock_quantity'],
+        'is_in_stock': not variant['track_inventory'] or variant['stock_quantity'] > 0,
+        'is_available': variant['is_active'] and (
+            not variant['track_inventory'] or quantity <= variant['stock_quantity']
+        ),
+    }
+    # updated_at covers renames; stock and price are hashed directly since
+    # bulk and F() stock updates may leave updated_at untouched.
+    line['version'] = _digest(quantity, *(variant[field] for field in VARIANT_FIELDS))
+    return line
+
+
+def get_cart_lines(cart):
+    """Snapshot lines of a ``Cart`` or ``GuestCart``, in one query."""
+    if cart.id is None:
+        quantities = cart.get_lines()
+        if not quantities:
+            return []
+        rows = ProductVariant.objects.filter(pk__in=list(quantities)).values('id', *VARIANT_FIELDS)
+        return [_make_line(row['id'], row, quantities[row['id']]) for row in rows]
+    
+    rows = (
+        CartItem.objects.filter(cart=cart).order_by('created_at')
+        .values('variant_id', 'quantity', *(f'variant__{field}' for field in VARIANT_FIELDS))
+    )
+    return [
+        _make_line(
+            row['variant_id'], {field: row[f'variant__{field}'] for field in VARIANT_FIELDS}, row['quantity']
+        )
+        for row in rows
+    ]
+
+
+def _snapshot_key(cart, version):
+    # Scoped per cart so versions are never shared between carts.
+    scope = f'guest:{cart.cart_id}' if cart.id is None else cart.id
+    return f"{SNAPSHOT_KEY_PREFIX}:{scope}:{version}"
+
+
+def build_cart_snapshot(cart, since=None):
+    """Return the cart snapshot, reduced to changes if ``since`` is a known version."""
+    lines = get_cart_lines(cart)
+    versions = {line['variant_id']: line['version'] for line in lines}
+    version = _digest(*sorted(versions.items()))
+    
+    shared = caches['default']
+    shared.set(_snapshot_key(cart, version), versions, get_cache_ttl('cart_snapshot'))
+    previous = shared.get(_snapshot_key(cart, since)) if since else None
+    
+    totals = calculate_line_totals((line['price'], line['quantity']) for line in lines)
+    snapshot = {
+        'version': version,
+        'since': since if previous is not None else None,
+        'lines': lines,
+        'removed': [],
+        'totals': totals.as_dict(),
+    }
+    if previous is not None:
+        snapshot['lines'] = [line for line in lines if previous.get(line['variant_id']) != line['version']]
+        snapshot['removed'] = sorted(set(previous) - set(versions))
+    return snapshot
@@ -0,0 +1,242 @@
+"""
+Guest cart storage.
+
+Anonymous carts are kept out of Postgres: their lines (``{variant_id: quantity}``)
+live in a key-value store with a TTL, under a random id kept in the session so
+it survives the session key rotation on login. They are merged into the user's
+``Cart`` when the user logs in (see ``cart.signals``).
+
+The backend is pluggable via ``settings.CART_GUEST_STORE``:
+``CacheGuestCartStore`` uses a Django cache alias (Redis in production) and
+``InMemoryGuestCartStore`` is a process-local stand-in for tests and development.
+"""
+
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+from catalog.models import ProductVariant
+from .models import Cart, CartItem
+from .pricing import calculate_item_totals
+
+GUEST_CART_SESSION_KEY = 'guest_cart_id'
+
+
+class BaseGuestCartStore:
+    """Interface for guest cart backends; lines are ``{variant_id: quantity}``."""
+    
+    def __init__(self, ttl=None):
+        self.ttl = ttl or settings.CART_GUEST_TTL
+    
+    def get(self, cart_id):
+        raise NotImplementedError
+    
+    def save(self, cart_id, lines):
+        """Replace the lines of a cart and refresh its TTL."""
+        raise NotImplementedError
+    
+    def delete(self, cart_id):
+        raise NotImplementedError
+    
+    def set_quantity(self, cart_id, variant_id, quantity):
+        lines = self.get(cart_id)
+        if quantity > 0:
+            lines[variant_id] = quantity
+        else:
+            lines.pop(variant_id, None)
+        self.save(cart_id, lines)
+        return lines
+    
+    def add(self, cart_id, variant_id, quantity):
+        lines = self.get(cart_id)
+        return self.set_quantity(cart_id, variant_id, lines.get(variant_id, 0) + quantity)
+
+
+class CacheGuestCartStore(BaseGuestCartStore):
+    """Guest carts in a Django cache alias (``settings.CART_GUEST_CACHE``)."""
+    
+    key_prefix = 'cart:guest'
+    
+    def __init__(self, ttl=None, alias=None):
+        super().__init__(ttl)
+        self.cache = caches[alias or settings.CART_GUEST_CACHE]
+    
+    def _key(self, cart_id):
+        return f"{self.key_prefix}:{cart_id}"
+    
+    def get(self, cart_id):
+        return dict(self.cache.get(self._key(cart_id)) or {})
+    
+    def save(self, cart_id, lines):
+        if lines:
+            self.cache.set(self._key(cart_id), lines, self.ttl)
+        else:
+            self.delete(cart_id)
+    
+    def delete(self, cart_id):
+        self.cache.delete(self._key(cart_id))
+
+
+class InMemoryGuestCartStore(BaseGuestCartStore):
+    """Thread-safe process-local guest carts with a TTL."""
+    
+    def __init__(self, ttl=None):
+        super().__init__(ttl)
+        self._data = {}
+        self._lock = threading.Lock()
+    
+    def get(self, cart_id):
+        with self._lock:
+            entry = self._data.get(cart_id)
+            if entry is None:
+                return {}
+            expires_at, lines = entry
+            if expires_at < time.monotonic():
+                del self._data[cart_id]
+                return {}
+            return dict(lines)
+    
+    def save(self, cart_id, lines):
+        with self._lock:
+            if lines:
+                self._data[cart_id] = (time.monotonic() + self.ttl, dict(lines))
+            else:
+                self._data.pop(cart_id, None)
+    
+    def delete(self, cart_id):
+        with self._lock:
+            self._data.pop(cart_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_stores = {}
+
+
+def get_guest_cart_store():
+    """Return the configured guest cart store (one instance per backend)."""
+    path = settings.CART_GUEST_STORE
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
+
+
+def get_guest_cart_id(request, create=False):
+    """Return the guest cart id from the session, optionally allocating one."""
+    cart_id = request.session.get(GUEST_CART_SESSION_KEY)
+    if cart_id is None and create:
+        cart_id = uuid.uuid4().hex
+        request.session[GUEST_CART_SESSION_KEY] = cart_id
+    return cart_id
+
+
+class GuestCart:
+    """
+    A session's guest cart, shaped like ``Cart`` for the cart views and serializers.
+    
+    Lines are unsaved ``CartItem`` instances whose ``id`` is the variant id.
+    """
+    
+    id = None
+    created_at = None
+    updated_at = None
+    
+    def __init__(self, request):
+        self.request = request
+        self.store = get_guest_cart_store()
+        self.cart_id = get_guest_cart_id(request)
+    
+    @cached_property
+    def items(self):
+        lines = self.get_lines()
+        variants = ProductVariant.objects.select_related('product').in_bulk(list(lines))
+        return [
+            CartItem(id=variant_id, variant=variants[variant_id], quantity=quantity)
+            for variant_id, quantity in lines.items()
+            if variant_id in variants
+        ]
+    
+    def _changed(self):
+        self.__dict__.pop('items', None)
+    
+    def get_lines(self):
+        return self.store.get(self.cart_id) if self.cart_id else {}
+    
+    def get_item(self, item_id):
+        return next((item for item in self.items if item.id == item_id), None)
+    
+    def get_totals(self):
+        return calculate_item_totals(self.items)
+    
+    @property
+    def totals(self):
+        return self.get_totals().as_dict()
+    
+    def add(self, variant_id, quantity, variant=None):
+        """
+        Add to a line, validating stock like ``CartItem.clean``; returns the line.
+        
+        Pass ``variant`` (with its product) when already loaded to save a query.
+        """
+        if self.cart_id is None:
+            self.cart_id = get_guest_cart_id(self.request, create=True)
+        current = self.get_item(variant_id)
+        if current:
+            variant = current.variant
+        elif variant is None:
+            variant = ProductVariant.objects.select_related('product').get(pk=variant_id)
+        line = CartItem(id=variant_id, variant=variant, quantity=(current.quantity if current else 0) + quantity)
+        line.clean()
+        self.store.set_quantity(self.cart_id, variant_id, line.quantity)
+        self._changed()
+        return line
+    
+    def set_quantity(self, variant_id, quantity):
+        if self.cart_id is not None:
+            self.store.set_quantity(self.cart_id, variant_id, quantity)
+            self._changed()
+    
+    def clear(self):
+        if self.cart_id is not None:
+            self.store.delete(self.cart_id)
+            self._changed()
+
+
+def merge_guest_cart(request, user):
+    """
+    Move the session's guest cart into the user's cart.
+    
+    Quantities are added to existing lines and capped at available stock;
+    inactive or deleted variants are dropped.
+    """
+    cart_id = request.session.pop(GUEST_CART_SESSION_KEY, None)
+    if cart_id is None:
+        return None
+    store = get_guest_cart_store()
+    lines = store.get(cart_id)
+    store.delete(cart_id)
+    if not lines:
+        return None
+    
+    variants = ProductVariant.objects.filter(is_active=True).in_bulk(list(lines))
+    with transaction.atomic():
+        cart, created = Cart.objects.get_or_create(user=user)
+        existing = {
+            item.variant_id: item
+            for item in cart.items.select_related('variant').select_for_update().filter(variant_id__in=variants)
+        }
+        for variant_id, variant in variants.items():
+            item = existing.get(variant_id) or CartItem(cart=cart, variant=variant, quantity=0)
+            quantity = item.quantity + lines[variant_id]
+            if variant.track_inventory:
+                quantity = min(quantity, variant.stock_quantity)
+            if quantity > item.quantity:
+                item.quantity = quantity
+                item.save()
+    return cart
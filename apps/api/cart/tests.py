@@ -1,11 +1,24 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.sessions.backends.db import SessionStore
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from decimal import Decimal
 from accounts.models import User
 from catalog.models import Category, Product, ProductVariant
+from .maintenance import purge_stale_carts
 from .models import Cart, CartItem
+from .serializers import CartBulkSerializer, CartItemSerializer
+from .snapshot import build_cart_snapshot
+from .storage import get_guest_cart_store, merge_guest_cart, GUEST_CART_SESSION_KEY
 
 
 class CartModelTest(TestCase):
@@ -60,6 +73,456 @@ class CartModelTest(TestCase):
         self.assertEqual(self.cart.total, Decimal('219.978'))
 
 
+class CartPricingTest(TestCase):
+    """Test that cart totals come from one memoized computation."""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        self.cart = Cart.objects.create(session_key='pricing-test')
+        for i in range(5):
+            variant = ProductVariant.objects.create(
+                product=product, sku=f'TEST-{i}', price=Decimal('10.50'), stock_quantity=10
+            )
+            CartItem.objects.create(cart=self.cart, variant=variant, quantity=i + 1)
+        self.cart = Cart.objects.get(pk=self.cart.pk)
+    
+    def test_totals_use_single_aggregate(self):
+        with self.assertNumQueries(1):
+            totals = self.cart.totals
+            self.assertEqual(self.cart.subtotal, Decimal('157.50'))
+            self.assertEqual(self.cart.tax_amount, Decimal('15.75'))
+            self.assertEqual(self.cart.total, Decimal('173.25'))
+            self.assertEqual(self.cart.total_items, 15)
+        self.assertEqual(totals, {'subtotal': 157.5, 'tax_amount': 15.75, 'total': 173.25, 'item_count': 15})
+    
+    def test_totals_reuse_prefetched_lines(self):
+        prefetch_related_objects([self.cart], 'items__variant')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cart.subtotal, Decimal('157.50'))
+    
+    def test_item_changes_invalidate_memoized_totals(self):
+        self.assertEqual(self.cart.total_items, 15)
+        item = self.cart.items.first()
+        item.quantity += 1
+        item.save()
+        self.assertEqual(self.cart.total_items, 16)
+        item.delete()
+        self.assertEqual(self.cart.total_items, 14)
+    
+    def test_empty_cart(self):
+        cart = Cart.objects.create(session_key='empty')
+        self.assertEqual(cart.get_totals(), (Decimal('0.00'), Decimal('0.000'), Decimal('0.000'), 0))
+
+
+class CartSummaryTest(TestCase):
+    """Test the denormalized cart summary columns."""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        self.variant = ProductVariant.objects.create(
+            product=product, sku='TEST-001', price=Decimal('10.00'), stock_quantity=10
+        )
+        self.other = ProductVariant.objects.create(
+            product=product, sku='TEST-002', price=Decimal('2.50'), stock_quantity=10
+        )
+        self.cart = Cart.objects.create(session_key='summary-test')
+    
+    def assertSummary(self, item_count, subtotal):
+        summary = Cart.objects.values_list('item_count', 'cached_subtotal').get(pk=self.cart.pk)
+        self.assertEqual(summary, (item_count, Decimal(subtotal)))
+    
+    def test_item_writes_adjust_summary(self):
+        item = CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+        CartItem.objects.create(cart=self.cart, variant=self.other, quantity=4)
+        self.assertSummary(6, '30.00')
+        
+        item = CartItem.objects.get(pk=item.pk)
+        item.quantity = 5
+        item.save()
+        self.assertSummary(9, '60.00')
+        
+        item.delete()
+        self.assertSummary(4, '10.00')
+    
+    def test_deletes_survive_price_changes(self):
+        item = CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+        CartItem.objects.create(cart=self.cart, variant=self.other, quantity=4)
+        ProductVariant.objects.filter(pk=self.variant.pk).update(price=Decimal('25.00'))
+        CartItem.objects.get(pk=item.pk).delete()
+        self.assertSummary(4, '10.00')
+        
+        ProductVariant.objects.filter(pk=self.other.pk).update(price=Decimal('1.00'))
+        self.cart.items.filter(variant=self.other).delete()
+        self.assertSummary(0, '0.00')
+    
+    def test_cascaded_variant_delete_recomputes_summary(self):
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+        CartItem.objects.create(cart=self.cart, variant=self.other, quantity=4)
+        self.variant.delete()
+        self.assertSummary(4, '10.00')
+    
+    def test_clear_zeroes_summary(self):
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=3)
+        self.cart.clear()
+        self.assertSummary(0, '0.00')
+        self.assertFalse(self.cart.items.exists())
+    
+    def test_stale_cart_save_keeps_summary(self):
+        stale = Cart.objects.get(pk=self.cart.pk)
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=1)
+        stale.session_key = 'renamed'
+        stale.save()
+        self.assertSummary(1, '10.00')
+    
+    def test_sync_summary_repairs_drift(self):
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+        Cart.objects.filter(pk=self.cart.pk).update(item_count=99)
+        cart = Cart.objects.get(pk=self.cart.pk)
+        cart.sync_summary()
+        self.assertSummary(2, '20.00')
+    
+    def test_cart_view_is_read_only(self):
+        user = User.objects.create_user(username='reader', email='reader@example.com', password='testpass123')
+        Cart.objects.filter(pk=self.cart.pk).update(user=user, session_key=None)
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('cart-detail'))
+        self.assertEqual(response.data['totals']['item_count'], 2)
+        self.assertFalse([q for q in queries if not q['sql'].lstrip().upper().startswith('SELECT')])
+
+
+@override_settings(CART_GUEST_STORE='cart.storage.InMemoryGuestCartStore')
+class GuestCartTest(APITestCase):
+    """Test anonymous carts kept in the guest cart store."""
+    
+    def setUp(self):
+        get_guest_cart_store().clear()
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        self.variant = ProductVariant.objects.create(
+            product=product, sku='TEST-001', price=Decimal('10.00'), stock_quantity=5
+        )
+    
+    def test_guest_cart_does_not_touch_cart_tables(self):
+        response = self.client.post(reverse('cart-item-create'), {'variant_id': self.variant.id, 'quantity': 2})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.post(reverse('cart-item-create'), {'variant_id': self.variant.id, 'quantity': 1})
+        
+        response = self.client.get(reverse('cart-detail'))
+        self.assertEqual(response.data['items'][0]['id'], self.variant.id)
+        self.assertEqual(response.data['items'][0]['quantity'], 3)
+        self.assertEqual(response.data['totals']['subtotal'], 30.0)
+        self.assertEqual(self.client.get(reverse('cart-summary')).data['item_count'], 3)
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(CartItem.objects.exists())
+    
+    def test_guest_update_and_delete(self):
+        self.client.post(reverse('cart-item-create'), {'variant_id': self.variant.id, 'quantity': 2})
+        url = reverse('cart-item-update', kwargs={'item_id': self.variant.id})
+        self.assertEqual(self.client.patch(url, {'quantity': 4}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('cart-totals')).data['item_count'], 4)
+        
+        url = reverse('cart-item-delete', kwargs={'item_id': self.variant.id})
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(reverse('cart-detail')).data['items'], [])
+    
+    def test_store_ttl(self):
+        store = get_guest_cart_store()
+        store.ttl = -1
+        try:
+            store.add('expired', self.variant.id, 1)
+            self.assertEqual(store.get('expired'), {})
+        finally:
+            store.ttl = 60
+    
+    def test_merge_into_user_cart_caps_at_stock(self):
+        user = User.objects.create_user(username='merge', email='merge@example.com', password='testpass123')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, variant=self.variant, quantity=3)
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        request.session[GUEST_CART_SESSION_KEY] = 'guest'
+        get_guest_cart_store().add('guest', self.variant.id, 4)
+        
+        merge_guest_cart(request, user)
+        self.assertEqual(cart.items.get().quantity, 5)
+        self.assertEqual(get_guest_cart_store().get('guest'), {})
+        self.assertNotIn(GUEST_CART_SESSION_KEY, request.session)
+    
+    def test_guest_add_counts_existing_line_against_stock(self):
+        url = reverse('cart-item-create')
+        self.client.post(url, {'variant_id': self.variant.id, 'quantity': 3})
+        response = self.client.post(url, {'variant_id': self.variant.id, 'quantity': 3})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('quantity', response.data)
+        self.assertEqual(self.client.get(reverse('cart-totals')).data['item_count'], 3)
+    
+    def test_guest_add_rejects_inactive_variant(self):
+        self.variant.is_active = False
+        self.variant.save()
+        response = self.client.post(reverse('cart-item-create'), {'variant_id': self.variant.id, 'quantity': 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('variant_id', response.data)
+        self.assertEqual(self.client.get(reverse('cart-detail')).data['items'], [])
+    
+    def test_guest_update_checks_stock(self):
+        self.client.post(reverse('cart-item-create'), {'variant_id': self.variant.id, 'quantity': 2})
+        url = reverse('cart-item-update', kwargs={'item_id': self.variant.id})
+        self.assertEqual(self.client.patch(url, {'quantity': 6}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('cart-totals')).data['item_count'], 2)
+    
+    def test_guest_clear(self):
+        self.client.post(reverse('cart-item-create'), {'variant_id': self.variant.id, 'quantity': 2})
+        self.assertEqual(self.client.post(reverse('cart-clear')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('cart-summary')).data['item_count'], 0)
+
+
+class CartItemUpsertTest(TestCase):
+    """Test the atomic add-to-cart upsert."""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        self.variant = ProductVariant.objects.create(
+            product=product, sku='TEST-001', price=Decimal('10.00'), stock_quantity=5
+        )
+        self.cart = Cart.objects.create(session_key='upsert-test')
+    
+    def test_add_quantity_inserts_then_increments(self):
+        item = CartItem.add_quantity(self.cart.id, self.variant, 2)
+        self.assertEqual(item.quantity, 2)
+        item = CartItem.add_quantity(self.cart.id, self.variant, 3)
+        self.assertEqual(item.quantity, 5)
+        self.assertEqual(self.cart.items.get().quantity, 5)
+        summary = Cart.objects.values_list('item_count', 'cached_subtotal').get(pk=self.cart.pk)
+        self.assertEqual(summary, (5, Decimal('50.00')))
+    
+    def test_add_quantity_enforces_stock_ceiling(self):
+        CartItem.add_quantity(self.cart.id, self.variant, 4)
+        self.assertIsNone(CartItem.add_quantity(self.cart.id, self.variant, 2))
+        self.assertEqual(self.cart.items.get().quantity, 4)
+        self.assertEqual(Cart.objects.get(pk=self.cart.pk).item_count, 4)
+        
+        self.variant.track_inventory = False
+        self.variant.save()
+        self.assertEqual(CartItem.add_quantity(self.cart.id, self.variant, 10).quantity, 14)
+    
+    def test_add_quantity_rejects_inactive_variant(self):
+        self.variant.is_active = False
+        self.variant.save()
+        self.assertIsNone(CartItem.add_quantity(self.cart.id, self.variant, 1))
+        self.assertFalse(self.cart.items.exists())
+    
+    def test_serializer_loads_variant_once(self):
+        serializer = CartItemSerializer(
+            data={'variant_id': self.variant.id, 'quantity': 2}, context={'cart': self.cart}
+        )
+        # variant, then savepoint, upsert, summary update, release
+        with self.assertNumQueries(5):
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        self.assertEqual(self.cart.items.get().quantity, 2)
+    
+    def test_serializer_reports_stock_ceiling(self):
+        serializer = CartItemSerializer(
+            data={'variant_id': self.variant.id, 'quantity': 3}, context={'cart': self.cart}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        
+        serializer = CartItemSerializer(
+            data={'variant_id': self.variant.id, 'quantity': 3}, context={'cart': self.cart}
+        )
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        self.assertEqual(self.cart.items.get().quantity, 3)
+
+
+@override_settings(CART_GUEST_STORE='cart.storage.InMemoryGuestCartStore')
+class CartBulkUpdateTest(APITestCase):
+    """Test batched add/set/remove cart operations."""
+    
+    def setUp(self):
+        get_guest_cart_store().clear()
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        self.variant = ProductVariant.objects.create(
+            product=product, sku='TEST-001', price=Decimal('10.00'), stock_quantity=5
+        )
+        self.other = ProductVariant.objects.create(
+            product=product, sku='TEST-002', price=Decimal('2.50'), stock_quantity=10
+        )
+        self.cart = Cart.objects.create(session_key='bulk-test')
+    
+    def apply(self, cart, operations):
+        serializer = CartBulkSerializer(data={'operations': operations}, context={'cart': cart})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+    
+    def test_operations_upsert_in_one_statement(self):
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=1)
+        operations = [
+            {'op': 'add', 'variant_id': self.variant.id, 'quantity': 2},
+            {'op': 'set', 'variant_id': self.other.id, 'quantity': 4},
+            {'op': 'add', 'variant_id': self.other.id},
+        ]
+        # savepoint, lock, variants, upsert, summary, savepoint release
+        with self.assertNumQueries(6):
+            with transaction.atomic():
+                self.apply(self.cart, operations)
+        
+        self.assertEqual(
+            dict(self.cart.items.values_list('variant_id', 'quantity')),
+            {self.variant.id: 3, self.other.id: 5},
+        )
+        summary = Cart.objects.values_list('item_count', 'cached_subtotal').get(pk=self.cart.pk)
+        self.assertEqual(summary, (8, Decimal('42.50')))
+    
+    def test_remove_and_set_zero_delete_lines(self):
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+        CartItem.objects.create(cart=self.cart, variant=self.other, quantity=2)
+        self.apply(self.cart, [
+            {'op': 'remove', 'variant_id': self.variant.id},
+            {'op': 'set', 'variant_id': self.other.id, 'quantity': 0},
+        ])
+        self.assertFalse(self.cart.items.exists())
+        self.assertEqual(Cart.objects.get(pk=self.cart.pk).item_count, 0)
+    
+    def test_reports_every_stock_error(self):
+        serializer = CartBulkSerializer(data={'operations': [
+            {'op': 'add', 'variant_id': self.variant.id, 'quantity': 6},
+            {'op': 'set', 'variant_id': self.other.id, 'quantity': 11},
+        ]}, context={'cart': self.cart})
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['out_of_stock_items'], [
+            {'variant_id': self.variant.id, 'name': self.variant.display_name, 'requested': 6, 'available': 5},
+            {'variant_id': self.other.id, 'name': self.other.display_name, 'requested': 11, 'available': 10},
+        ])
+        
+        serializer = CartBulkSerializer(
+            data={'operations': [{'op': 'add', 'variant_id': 999999}]}, context={'cart': self.cart}
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('operations', serializer.errors)
+    
+    def test_bulk_endpoint_requires_login(self):
+        response = self.client.post(reverse('cart-item-bulk'), {'operations': [
+            {'op': 'add', 'variant_id': self.variant.id, 'quantity': 2},
+        ]}, format='json')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.assertEqual(self.client.get(reverse('cart-totals')).data['item_count'], 0)
+        self.assertFalse(CartItem.objects.exists())
+
+
+@override_settings(CART_GUEST_STORE='cart.storage.InMemoryGuestCartStore')
+class CartSnapshotTest(APITestCase):
+    """Test compact cart snapshots and changed-line polling."""
+    
+    def setUp(self):
+        get_guest_cart_store().clear()
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        self.variant = ProductVariant.objects.create(
+            product=product, sku='TEST-001', price=Decimal('10.00'), stock_quantity=5
+        )
+        self.other = ProductVariant.objects.create(
+            product=product, sku='TEST-002', price=Decimal('2.50'), stock_quantity=10
+        )
+        self.cart = Cart.objects.create(session_key='snapshot-test')
+        CartItem.objects.create(cart=self.cart, variant=self.variant, quantity=2)
+        CartItem.objects.create(cart=self.cart, variant=self.other, quantity=1)
+    
+    def test_snapshot_reads_lines_in_one_query(self):
+        with self.assertNumQueries(1):
+            snapshot = build_cart_snapshot(self.cart)
+        self.assertIsNone(snapshot['since'])
+        self.assertEqual([line['variant_id'] for line in snapshot['lines']], [self.variant.id, self.other.id])
+        self.assertEqual(snapshot['lines'][0]['name'], 'Test Product - TEST-001')
+        self.assertEqual(snapshot['totals']['subtotal'], 22.5)
+    
+    def test_since_returns_only_changed_lines(self):
+        version = build_cart_snapshot(self.cart)['version']
+        unchanged = build_cart_snapshot(self.cart, since=version)
+        self.assertEqual(unchanged['version'], version)
+        self.assertEqual((unchanged['lines'], unchanged['removed']), ([], []))
+        
+        # Stock changes through update() leave updated_at alone but still count.
+        ProductVariant.objects.filter(pk=self.variant.pk).update(stock_quantity=1)
+        self.cart.items.filter(variant=self.other).delete()
+        changed = build_cart_snapshot(self.cart, since=version)
+        self.assertNotEqual(changed['version'], version)
+        self.assertEqual(changed['since'], version)
+        self.assertEqual([line['variant_id'] for line in changed['lines']], [self.variant.id])
+        self.assertFalse(changed['lines'][0]['is_available'])
+        self.assertEqual(changed['removed'], [self.other.id])
+    
+    def test_unknown_version_returns_full_cart(self):
+        snapshot = build_cart_snapshot(self.cart, since='unknown')
+        self.assertIsNone(snapshot['since'])
+        self.assertEqual(len(snapshot['lines']), 2)
+    
+    def test_guest_snapshot_endpoint(self):
+        self.client.post(reverse('cart-item-create'), {'variant_id': self.variant.id, 'quantity': 2})
+        response = self.client.get(reverse('cart-snapshot'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        line = response.json()['lines'][0]
+        self.assertEqual((line['price'], line['line_total']), ('10.00', '20.00'))
+        
+        self.client.post(reverse('cart-item-create'), {'variant_id': self.other.id, 'quantity': 1})
+        response = self.client.get(reverse('cart-snapshot'), {'since': response.data['version']})
+        self.assertEqual([line['variant_id'] for line in response.data['lines']], [self.other.id])
+        self.assertEqual(response.data['totals']['item_count'], 3)
+
+
+class PurgeStaleCartsTest(TestCase):
+    """Test batched deletion of abandoned carts."""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        variant = ProductVariant.objects.create(
+            product=product, sku='TEST-001', price=Decimal('10.00'), stock_quantity=10
+        )
+        self.stale = [Cart.objects.create(session_key=f'stale-{i}') for i in range(3)]
+        self.fresh = Cart.objects.create(session_key='fresh')
+        for cart in self.stale + [self.fresh]:
+            CartItem.objects.create(cart=cart, variant=variant, quantity=1)
+        Cart.objects.filter(pk__in=[cart.pk for cart in self.stale]).update(
+            updated_at=timezone.now() - timedelta(days=40)
+        )
+    
+    def test_purges_in_batches(self):
+        batches = list(purge_stale_carts(timedelta(days=30), batch_size=2))
+        self.assertEqual(batches, [(2, 2), (1, 1)])
+        self.assertEqual(list(Cart.objects.all()), [self.fresh])
+        self.assertEqual(CartItem.objects.get().cart_id, self.fresh.id)
+    
+    def test_command(self):
+        out = StringIO()
+        call_command('purge_stale_carts', days=30, stdout=out)
+        self.assertIn('Purged 3 stale carts and 3 related rows', out.getvalue())
+        self.assertEqual(Cart.objects.count(), 1)
+
+
 class CartAPITest(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
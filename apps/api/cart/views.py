@@ -1,41 +1,56 @@
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from .models import Cart, CartItem
-from .serializers import CartSerializer, CartItemSerializer, CartUpdateSerializer
+from .serializers import (
+    CartSerializer, CartItemSerializer, CartUpdateSerializer, CartBulkSerializer, CartSnapshotSerializer
+)
+from .snapshot import build_cart_snapshot
+from .storage import GuestCart
 
 
 def get_or_create_cart(request):
-    """Get or create cart for user or session."""
+    """Get or create the user's cart; anonymous sessions get a store-backed GuestCart."""
     if request.user.is_authenticated:
         cart, created = Cart.objects.get_or_create(user=request.user)
-    else:
-        session_key = request.session.session_key
-        if not session_key:
-            request.session.create()
-            session_key = request.session.session_key
-        cart, created = Cart.objects.get_or_create(session_key=session_key)
-    return cart
+        return cart
+    return GuestCart(request)
+
+
+def get_guest_item_or_404(cart, item_id):
+    """Guest cart lines are addressed by variant id."""
+    item = cart.get_item(item_id)
+    if item is None:
+        raise Http404
+    return item
 
 
 class CartView(generics.RetrieveAPIView):
     """Get current user's cart."""
     
     serializer_class = CartSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
     
     def get_object(self):
-        return get_or_create_cart(self.request)
+        cart = get_or_create_cart(self.request)
+        if cart.id is None:
+            return cart
+        # Lines, variants and products in three queries; totals reuse them.
+        # Read-only: badge drift is repaired by writes, never by a GET.
+        prefetch_related_objects([cart], 'items__variant__product')
+        return cart
 
 
 class CartItemCreateView(generics.CreateAPIView):
     """Add item to cart."""
     
     serializer_class = CartItemSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -47,10 +62,12 @@ class CartItemUpdateView(generics.UpdateAPIView):
     """Update cart item quantity."""
     
     serializer_class = CartUpdateSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
     
     def get_object(self):
         cart = get_or_create_cart(self.request)
+        if cart.id is None:
+            return get_guest_item_or_404(cart, self.kwargs['item_id'])
         cart_item = get_object_or_404(
             CartItem, 
             cart=cart, 
@@ -68,7 +85,9 @@ class CartItemUpdateView(generics.UpdateAPIView):
         cart_item = self.get_object()
         new_quantity = serializer.validated_data['quantity']
         
-        if new_quantity == 0:
+        if cart_item.cart_id is None:
+            get_or_create_cart(self.request).set_quantity(cart_item.variant_id, new_quantity)
+        elif new_quantity == 0:
             cart_item.delete()
         else:
             cart_item.quantity = new_quantity
@@ -78,29 +97,90 @@ class CartItemUpdateView(generics.UpdateAPIView):
 class CartItemDeleteView(generics.DestroyAPIView):
     """Remove item from cart."""
     
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
     
     def get_object(self):
         cart = get_or_create_cart(self.request)
+        if cart.id is None:
+            return get_guest_item_or_404(cart, self.kwargs['item_id'])
         return get_object_or_404(
             CartItem, 
             cart=cart, 
             id=self.kwargs['item_id']
         )
+    
+    def perform_destroy(self, instance):
+        if instance.cart_id is None:
+            get_or_create_cart(self.request).set_quantity(instance.variant_id, 0)
+        else:
+            instance.delete()
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+def bulk_update_cart(request):
+    """Apply several add/set/remove operations to the user's cart in one transaction."""
+    cart = get_or_create_cart(request)
+    serializer = CartBulkSerializer(data=request.data, context={'cart': cart})
+    with transaction.atomic():
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        out_of_stock_items = serializer.validated_data['out_of_stock_items']
+        if out_of_stock_items:
+            return Response({
+                'error': 'Some items are out of stock',
+                'out_of_stock_items': out_of_stock_items
+            }, status=status.HTTP_400_BAD_REQUEST)
+        serializer.save()
+    
+    prefetch_related_objects([cart], 'items__variant__product')
+    return Response(CartSerializer(cart, context={'request': request}).data)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
 def clear_cart(request):
     """Clear all items from cart."""
     cart = get_or_create_cart(request)
-    cart.items.all().delete()
+    cart.clear()
     return Response({'message': 'Cart cleared successfully'})
 
 
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([AllowAny])
 def cart_totals(request):
     """Get cart totals only."""
     cart = get_or_create_cart(request)
-    return Response(cart.totals)
\ No newline at end of file
+    return Response(cart.totals)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def cart_summary(request):
+    """Get item count and subtotal for the mini-cart badge from the cart row."""
+    if not request.user.is_authenticated:
+        totals = GuestCart(request).get_totals()
+        return Response({'id': None, 'item_count': totals.item_count, 'subtotal': float(totals.subtotal)})
+    
+    summary = Cart.objects.filter(user=request.user).values('id', 'item_count', 'cached_subtotal').first()
+    if summary is None:
+        return Response({'id': None, 'item_count': 0, 'subtotal': 0.0})
+    return Response({
+        'id': summary['id'],
+        'item_count': summary['item_count'],
+        'subtotal': float(summary['cached_subtotal']),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def cart_snapshot(request):
+    """
+    Get a compact cart for polling.
+    
+    Pass the ``version`` from a previous response as ``?since=`` to receive
+    only the lines that changed since then.
+    """
+    cart = get_or_create_cart(request)
+    snapshot = build_cart_snapshot(cart, since=request.query_params.get('since'))
+    return Response(CartSnapshotSerializer(snapshot).data)
@@ -28,9 +28,10 @@ class ProductVariantInline(admin.TabularInline):
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug', 'category', 'is_active', 'is_featured', 'price_range', 'created_at']
-    list_filter = ['is_active', 'is_featured', 'category', 'created_at']
+    list_filter = ['is_active', 'is_featured', 'has_stock', 'category', 'created_at']
     search_fields = ['name', 'slug', 'description']
     prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ['has_stock']
     inlines = [ProductImageInline, ProductVariantInline]
     ordering = ['-created_at']
     
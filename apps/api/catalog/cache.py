@@ -0,0 +1,202 @@
+"""
+Versioned caches for the catalog.
+
+The category tree (ids, slugs, paths, depth, product counts) is built with two
+queries and stored under a versioned key. ``Category`` and ``Product``
+save/delete signals bump the version (see ``catalog.signals``), so readers move
+to a new key and stale entries simply expire. Reads check the per-process
+``local`` cache first and fall back to the shared ``default`` cache.
+
+Product detail payloads are cached per slug together with the product version
+(a timestamp bumped by product, variant and image writes) and the category
+tree version they were built from; an entry is only served while both match.
+"""
+
+import hashlib
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.core.cache import caches
+from django.db.models import Count
+from rest_framework.utils.encoders import JSONEncoder
+from api.performance import get_cache_config, get_cache_ttl
+from .models import Category, Product
+from .serializers import CategorySerializer
+
+CATEGORY_CACHE = get_cache_config('categories')
+TREE_VERSION_KEY = f"{CATEGORY_CACHE['key_prefix']}:tree:version"
+
+
+def _tree_key(version):
+    return f"{CATEGORY_CACHE['key_prefix']}:tree:v{CATEGORY_CACHE['version']}:{version}"
+
+
+def get_category_tree_version():
+    """Return the current tree version from the shared cache."""
+    shared = caches['default']
+    version = shared.get(TREE_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version.
+        shared.add(TREE_VERSION_KEY, time.time_ns(), timeout=None)
+        version = shared.get(TREE_VERSION_KEY)
+    return version
+
+
+def bump_category_tree_version():
+    """Invalidate every cached copy of the category tree."""
+    shared = caches['default']
+    try:
+        return shared.incr(TREE_VERSION_KEY)
+    except ValueError:
+        shared.add(TREE_VERSION_KEY, time.time_ns(), timeout=None)
+        return shared.get(TREE_VERSION_KEY)
+
+
+def build_category_tree():
+    """Materialize all categories with their path, depth and product counts."""
+    categories = list(Category.objects.order_by('name'))
+    counts = dict(
+        Product.objects.filter(is_active=True).order_by()
+        .values_list('category').annotate(count=Count('pk'))
+    )
+
+    nodes = {}
+    for data in CategorySerializer(categories, many=True).data:
+        node = dict(data)
+        node.update(children=[], product_count=counts.get(node['id'], 0))
+        nodes[node['id']] = node
+
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent'])
+        if parent is None:
+            roots.append(node['id'])
+        else:
+            parent['children'].append(node['id'])
+
+    def walk(node_id, ancestors):
+        node = nodes[node_id]
+        node['ancestors'] = ancestors
+        node['path'] = ' > '.join([nodes[pk]['name'] for pk in ancestors] + [node['name']])
+        node['depth'] = len(ancestors)
+        total = node['product_count']
+        for child_id in node['children']:
+            total += walk(child_id, ancestors + [node_id])
+        node['total_product_count'] = total
+        return total
+
+    for root_id in roots:
+        walk(root_id, [])
+
+    return {
+        'nodes': [nodes[category.pk] for category in categories if 'path' in nodes[category.pk]],
+        'roots': roots,
+    }
+
+
+def get_category_tree():
+    """Return the cached category tree, building it on a miss."""
+    version = get_category_tree_version()
+    key = _tree_key(version)
+    local, shared = caches['local'], caches['default']
+    timeout = get_cache_ttl('category_list')
+
+    tree = local.get(key)
+    if tree is not None:
+        return tree
+
+    tree = shared.get(key)
+    if tree is None:
+        tree = build_category_tree()
+        shared.set(key, tree, timeout)
+    local.set(key, tree, timeout)
+    return tree
+
+
+def get_active_categories():
+    """Flat list of active categories, ordered by name."""
+    return [node for node in get_category_tree()['nodes'] if node['is_active']]
+
+
+def get_active_category_tree():
+    """Nested active categories; children of inactive categories are omitted."""
+    tree = get_category_tree()
+    nodes = {node['id']: node for node in tree['nodes']}
+
+    def nest(node_id):
+        node = nodes[node_id]
+        return {
+            **{key: value for key, value in node.items() if key != 'children'},
+            'children': [nest(pk) for pk in node['children'] if nodes[pk]['is_active']],
+        }
+
+    return [nest(pk) for pk in tree['roots'] if nodes[pk]['is_active']]
+
+
+PRODUCT_CACHE = get_cache_config('products')
+
+
+def _product_version_key(product_id):
+    return f"{PRODUCT_CACHE['key_prefix']}:version:{product_id}"
+
+
+def _product_detail_key(slug, host):
+    return f"{PRODUCT_CACHE['key_prefix']}:detail:v{PRODUCT_CACHE['version']}:{host}:{slug}"
+
+
+def bump_product_versions(product_ids):
+    """Invalidate cached detail payloads for the given products."""
+    now = time.time_ns()
+    caches['default'].set_many(
+        {_product_version_key(pk): now for pk in product_ids},
+        get_cache_ttl('product_detail'),
+    )
+
+
+def get_product_detail_versions(product_id):
+    """Return ``(product_version, category_tree_version)`` for a product."""
+    shared = caches['default']
+    key = _product_version_key(product_id)
+    version = shared.get(key)
+    if version is None:
+        shared.add(key, time.time_ns(), get_cache_ttl('product_detail'))
+        version = shared.get(key)
+    return version, get_category_tree_version()
+
+
+def get_cached_product_detail(slug, host):
+    """Return the cached detail entry for a slug if it is still current."""
+    shared = caches['default']
+    entry = shared.get(_product_detail_key(slug, host))
+    if entry is None:
+        return None
+    current = shared.get_many([_product_version_key(entry['id']), TREE_VERSION_KEY])
+    if (current.get(_product_version_key(entry['id'])), current.get(TREE_VERSION_KEY)) != entry['versions']:
+        return None
+    return entry
+
+
+def cache_product_detail(slug, host, product, data, versions):
+    """
+    Store a serialized product under its slug with an ETag and Last-Modified.
+
+    ``versions`` must be read before ``data`` is built so that a concurrent
+    write always leaves the entry out of date rather than the other way round.
+    """
+    body = json.dumps(data, cls=JSONEncoder, sort_keys=True).encode()
+    timestamps = [product.updated_at, product.category.updated_at]
+    timestamps += [variant.updated_at for variant in product.variants.all()]
+    timestamps += [image.created_at for image in product.images.all()]
+    # The version is the time of the last write, which covers writes that
+    # do not touch updated_at (e.g. stock changes with update_fields).
+    timestamps.append(datetime.fromtimestamp(versions[0] / 1e9, tz=dt_timezone.utc))
+
+    entry = {
+        'id': product.pk,
+        'versions': versions,
+        'data': data,
+        'etag': f'"{hashlib.md5(body).hexdigest()}"',
+        'last_modified': int(max(timestamps).timestamp()),
+    }
+    caches['default'].set(_product_detail_key(slug, host), entry, get_cache_ttl('product_detail'))
+    return entry
@@ -0,0 +1,100 @@
+"""
+Facet counts for product listings.
+
+All facets are computed from a single grouped query over the filtered product
+set: products are grouped by every facet dimension at once and the per-facet
+counts are rolled up in Python, so a filter sidebar costs one round trip.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import Count, F, Func, IntegerField, Min, OuterRef, Subquery, Value
+from django.db.models.fields.json import KeyTextTransform
+from .models import Product, ProductVariant
+
+# (key, lower bound inclusive, upper bound exclusive)
+PRICE_BUCKETS = [
+    ('0-25', 0, 25),
+    ('25-50', 25, 50),
+    ('50-100', 50, 100),
+    ('100-250', 100, 250),
+    ('250-500', 250, 500),
+    ('500+', 500, None),
+]
+
+ATTRIBUTE_FACETS = ['color', 'material', 'brand']
+
+
+class WidthBucket(Func):
+    """Postgres ``width_bucket(value, thresholds)``: index of the bucket a value falls in."""
+    
+    function = 'width_bucket'
+    output_field = IntegerField()
+
+
+def price_bucket_expression(price):
+    """Index into PRICE_BUCKETS for a price expression (NULL when there is no price)."""
+    # Decimal thresholds keep the array numeric[] to match the price column.
+    thresholds = [Decimal(lower).quantize(Decimal('0.01')) for _, lower, _ in PRICE_BUCKETS[1:]]
+    return WidthBucket(price, Value(thresholds))
+
+
+def compute_facets(queryset):
+    """Return category, price, attribute and stock facet counts for a product queryset."""
+    active_variants = ProductVariant.objects.filter(product=OuterRef('pk'), is_active=True)
+    min_price = Subquery(
+        active_variants.order_by().values('product').annotate(value=Min('price')).values('value')
+    )
+    dimensions = {
+        'facet_price': price_bucket_expression(min_price),
+        'facet_in_stock': F('has_stock'),
+    }
+    for name in ATTRIBUTE_FACETS:
+        dimensions[f'facet_{name}'] = KeyTextTransform(name, 'attributes')
+
+    # Re-select by primary key so joins added by filters cannot double count.
+    rows = (
+        Product.objects.filter(pk__in=queryset.order_by().values('pk'))
+        .annotate(**dimensions)
+        .values('category_id', 'category__name', 'category__slug', *dimensions)
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+
+    categories = {}
+    prices = defaultdict(int)
+    attributes = {name: defaultdict(int) for name in ATTRIBUTE_FACETS}
+    in_stock = {'true': 0, 'false': 0}
+
+    for row in rows:
+        count = row['count']
+        category = categories.setdefault(row['category_id'], {
+            'id': row['category_id'],
+            'name': row['category__name'],
+            'slug': row['category__slug'],
+            'count': 0,
+        })
+        category['count'] += count
+        if row['facet_price'] is not None:
+            prices[PRICE_BUCKETS[row['facet_price']][0]] += count
+        for name in ATTRIBUTE_FACETS:
+            value = row[f'facet_{name}']
+            if value:
+                attributes[name][value] += count
+        in_stock['true' if row['facet_in_stock'] else 'false'] += count
+
+    facets = {
+        'category': sorted(categories.values(), key=lambda c: (-c['count'], c['name'])),
+        'price': [
+            {'key': key, 'min': lower, 'max': upper, 'count': prices[key]}
+            for key, lower, upper in PRICE_BUCKETS
+            if prices[key]
+        ],
+        'in_stock': in_stock,
+    }
+    for name in ATTRIBUTE_FACETS:
+        facets[name] = [
+            {'value': value, 'count': count}
+            for value, count in sorted(attributes[name].items(), key=lambda item: (-item[1], item[0]))
+        ]
+    return facets
@@ -1,13 +1,13 @@
 import django_filters
-from django.db.models import Q
 from .models import Product, Category
+from .search import filter_products
 
 
 class ProductFilter(django_filters.FilterSet):
     """Filter set for Product model."""
     
     category = django_filters.ModelChoiceFilter(queryset=Category.objects.filter(is_active=True))
-    category_slug = django_filters.CharFilter(field_name='category__slug')
+    category_slug = django_filters.CharFilter(method='filter_category_slug')
     min_price = django_filters.NumberFilter(field_name='variants__price', lookup_expr='gte')
     max_price = django_filters.NumberFilter(field_name='variants__price', lookup_expr='lte')
     is_featured = django_filters.BooleanFilter(field_name='is_featured')
@@ -18,28 +18,21 @@ class ProductFilter(django_filters.FilterSet):
         model = Product
         fields = ['category', 'category_slug', 'min_price', 'max_price', 'is_featured', 'in_stock', 'search']
     
+    def filter_category_slug(self, queryset, name, value):
+        """Filter products in a category or any of its descendants."""
+        path = Category.objects.filter(slug=value).values_list('path', flat=True).first()
+        if path is None:
+            return queryset.none()
+        return queryset.filter(category__path__startswith=path)
+    
     def filter_in_stock(self, queryset, name, value):
         """Filter products that have variants in stock."""
         if value:
-            return queryset.filter(
-                variants__is_active=True,
-                variants__track_inventory=False
-            ).union(
-                queryset.filter(
-                    variants__is_active=True,
-                    variants__track_inventory=True,
-                    variants__stock_quantity__gt=0
-                )
-            ).distinct()
+            return queryset.filter(has_stock=True)
         return queryset
     
     def filter_search(self, queryset, name, value):
-        """Filter products by search query."""
+        """Filter products by full-text search query."""
         if value:
-            return queryset.filter(
-                Q(name__icontains=value) |
-                Q(description__icontains=value) |
-                Q(short_description__icontains=value) |
-                Q(search_vector__icontains=value)
-            )
+            return filter_products(queryset, value)
         return queryset
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from catalog.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search vector for all products'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of products to update per statement (default: 1000)'
+        )
+    
+    def handle(self, *args, **options):
+        updated = update_search_vectors(batch_size=options['batch_size'])
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated search vectors for {updated} products')
+        )
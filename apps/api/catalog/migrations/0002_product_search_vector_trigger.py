@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce({prefix}name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({prefix}short_description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce({prefix}description, '')), 'C') || "
+    "setweight(jsonb_to_tsvector('english', coalesce({prefix}attributes, '{{}}'::jsonb), '[\"string\"]'), 'D')"
+)
+
+CREATE_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION catalog_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR_SQL.format(prefix='NEW.')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_product_search_vector
+BEFORE INSERT OR UPDATE OF name, short_description, description, attributes
+ON catalog_product
+FOR EACH ROW EXECUTE FUNCTION catalog_product_search_vector_update();
+
+UPDATE catalog_product SET search_vector = {SEARCH_VECTOR_SQL.format(prefix='')};
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS catalog_product_search_vector ON catalog_product;
+DROP FUNCTION IF EXISTS catalog_product_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 4.2.24 on 2026-10-17 07:21
+
+from django.db import migrations, models
+
+
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION catalog_product_refresh_has_stock(target_id bigint) RETURNS void AS $$
+    UPDATE catalog_product p
+    SET has_stock = s.in_stock
+    FROM (
+        SELECT EXISTS(
+            SELECT 1 FROM catalog_productvariant v
+            WHERE v.product_id = target_id
+              AND v.is_active
+              AND (NOT v.track_inventory OR v.stock_quantity > 0)
+        ) AS in_stock
+    ) s
+    WHERE p.id = target_id AND p.has_stock IS DISTINCT FROM s.in_stock;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION catalog_productvariant_has_stock_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM catalog_product_refresh_has_stock(OLD.product_id);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.product_id <> OLD.product_id) THEN
+        PERFORM catalog_product_refresh_has_stock(NEW.product_id);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_productvariant_has_stock_insert_delete
+AFTER INSERT OR DELETE ON catalog_productvariant
+FOR EACH ROW EXECUTE FUNCTION catalog_productvariant_has_stock_update();
+
+-- Only stock changes that cross zero (or change availability) touch the product row.
+CREATE TRIGGER catalog_productvariant_has_stock_update
+AFTER UPDATE ON catalog_productvariant
+FOR EACH ROW
+WHEN (
+    OLD.product_id <> NEW.product_id
+    OR OLD.is_active IS DISTINCT FROM NEW.is_active
+    OR OLD.track_inventory IS DISTINCT FROM NEW.track_inventory
+    OR (OLD.stock_quantity > 0) <> (NEW.stock_quantity > 0)
+)
+EXECUTE FUNCTION catalog_productvariant_has_stock_update();
+
+UPDATE catalog_product p SET has_stock = EXISTS(
+    SELECT 1 FROM catalog_productvariant v
+    WHERE v.product_id = p.id
+      AND v.is_active
+      AND (NOT v.track_inventory OR v.stock_quantity > 0)
+);
+
+-- has_stock is owned by the variant triggers: ignore values written directly
+-- (e.g. by saving a stale Product instance). Nested writes from the refresh
+-- function run at trigger depth > 1 and pass through.
+CREATE OR REPLACE FUNCTION catalog_product_guard_has_stock() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        NEW.has_stock := false;
+    ELSIF pg_trigger_depth() = 1 THEN
+        NEW.has_stock := OLD.has_stock;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_product_guard_has_stock
+BEFORE INSERT OR UPDATE OF has_stock ON catalog_product
+FOR EACH ROW EXECUTE FUNCTION catalog_product_guard_has_stock();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS catalog_product_guard_has_stock ON catalog_product;
+DROP FUNCTION IF EXISTS catalog_product_guard_has_stock();
+DROP TRIGGER IF EXISTS catalog_productvariant_has_stock_update ON catalog_productvariant;
+DROP TRIGGER IF EXISTS catalog_productvariant_has_stock_insert_delete ON catalog_productvariant;
+DROP FUNCTION IF EXISTS catalog_productvariant_has_stock_update();
+DROP FUNCTION IF EXISTS catalog_product_refresh_has_stock(bigint);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='has_stock',
+            field=models.BooleanField(default=False, help_text='Maintained by a database trigger: true when any active variant is purchasable'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('has_stock', True), ('is_active', True)), fields=['-created_at'], name='catalog_product_in_stock_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.24 on 2026-10-17 07:27
+
+from django.db import migrations, models
+
+
+CREATE_TRIGGER_SQL = """
+WITH RECURSIVE tree(id, path) AS (
+    SELECT id, '/' || id || '/' FROM catalog_category WHERE parent_id IS NULL
+    UNION ALL
+    SELECT c.id, t.path || c.id || '/'
+    FROM catalog_category c JOIN tree t ON c.parent_id = t.id
+)
+UPDATE catalog_category c SET path = tree.path FROM tree WHERE c.id = tree.id;
+
+CREATE OR REPLACE FUNCTION catalog_category_set_path() RETURNS trigger AS $$
+DECLARE
+    parent_path varchar;
+BEGIN
+    -- Descendant rewrites from catalog_category_move_subtree pass through.
+    IF TG_OP = 'UPDATE' AND pg_trigger_depth() > 1 THEN
+        RETURN NEW;
+    END IF;
+    IF NEW.parent_id IS NULL THEN
+        NEW.path := '/' || NEW.id || '/';
+    ELSE
+        SELECT path INTO parent_path FROM catalog_category WHERE id = NEW.parent_id;
+        IF parent_path LIKE '%/' || NEW.id || '/%' THEN
+            RAISE EXCEPTION 'Category % cannot be moved under its own descendant', NEW.id;
+        END IF;
+        NEW.path := parent_path || NEW.id || '/';
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_category_set_path
+BEFORE INSERT OR UPDATE OF parent_id, path ON catalog_category
+FOR EACH ROW EXECUTE FUNCTION catalog_category_set_path();
+
+CREATE OR REPLACE FUNCTION catalog_category_move_subtree() RETURNS trigger AS $$
+BEGIN
+    UPDATE catalog_category
+    SET path = NEW.path || substr(path, length(OLD.path) + 1)
+    WHERE path LIKE OLD.path || '%' AND id <> NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_category_move_subtree
+AFTER UPDATE OF parent_id ON catalog_category
+FOR EACH ROW
+WHEN (OLD.path IS DISTINCT FROM NEW.path)
+EXECUTE FUNCTION catalog_category_move_subtree();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS catalog_category_move_subtree ON catalog_category;
+DROP FUNCTION IF EXISTS catalog_category_move_subtree();
+DROP TRIGGER IF EXISTS catalog_category_set_path ON catalog_category;
+DROP FUNCTION IF EXISTS catalog_category_set_path();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Materialized path of ids from the root, e.g. /1/5/12/. Maintained by database triggers.', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='catalog_category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, JSONObject
 from django.contrib.postgres.indexes import GinIndex
 from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
@@ -18,6 +20,13 @@ class Category(models.Model):
         blank=True, 
         related_name='children'
     )
+    path = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        editable=False,
+        help_text='Materialized path of ids from the root, e.g. /1/5/12/. Maintained by database triggers.'
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -28,20 +37,89 @@ class Category(models.Model):
         indexes = [
             models.Index(fields=['slug']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['path'], name='catalog_category_path_idx', opclasses=['varchar_pattern_ops']),
+            GinIndex(fields=['name'], name='catalog_category_name_trgm', opclasses=['gin_trgm_ops']),
         ]
     
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # path is computed by the catalog_category_set_path trigger (migration 0006).
+        self.refresh_from_db(fields=['path'])
+    
+    @property
+    def ancestor_ids(self):
+        """Ids of the ancestors of this category, root first."""
+        return [int(pk) for pk in self.path.strip('/').split('/')[:-1]] if self.path else []
+    
+    @property
+    def depth(self):
+        """Number of ancestors (0 for a root category)."""
+        return len(self.ancestor_ids)
+    
+    def get_descendants(self, include_self=True):
+        """All categories below this one, using the indexed path prefix."""
+        queryset = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+    
     @property
     def full_path(self):
         """Get the full category path from root to this category."""
-        path = [self.name]
-        parent = self.parent
-        while parent:
-            path.insert(0, parent.name)
-            parent = parent.parent
-        return ' > '.join(path)
+        ancestor_ids = self.ancestor_ids
+        names = {}
+        if ancestor_ids:
+            names = dict(Category.objects.filter(pk__in=ancestor_ids).values_list('id', 'name'))
+        return ' > '.join([names[pk] for pk in ancestor_ids if pk in names] + [self.name])
+
+
+def format_price_range(min_price, max_price):
+    """Format a min/max price pair for display."""
+    if min_price is None:
+        return None
+    if min_price == max_price:
+        return f"${min_price}"
+    return f"${min_price} - ${max_price}"
+
+
+class ProductQuerySet(models.QuerySet):
+    """QuerySet with listing helpers for Product."""
+    
+    def with_listing_data(self):
+        """
+        Annotate the values listing serializers need so a page of products
+        is rendered without per-row queries.
+        
+        Aggregates are correlated subqueries rather than joins so they are not
+        multiplied by joins added by filters (e.g. ``variants__price``).
+        """
+        active_variants = ProductVariant.objects.filter(
+            product=OuterRef('pk'), is_active=True
+        ).order_by().values('product')
+        primary_image = ProductImage.objects.filter(
+            product=OuterRef('pk'), is_primary=True
+        ).order_by().values(
+            data=JSONObject(
+                id='id',
+                image='image',
+                alt_text='alt_text',
+                is_primary='is_primary',
+                sort_order='sort_order',
+            )
+        )[:1]
+        
+        return self.annotate(
+            min_price=Subquery(active_variants.annotate(value=Min('price')).values('value')),
+            max_price=Subquery(active_variants.annotate(value=Max('price')).values('value')),
+            active_variant_count=Coalesce(
+                Subquery(active_variants.annotate(value=Count('pk')).values('value')),
+                0,
+            ),
+            primary_image_data=Subquery(primary_image),
+        )
 
 
 class Product(models.Model):
@@ -55,12 +133,18 @@ class Product(models.Model):
     attributes = models.JSONField(default=dict, help_text="Product attributes like color, size, etc.")
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
+    has_stock = models.BooleanField(
+        default=False,
+        help_text="Maintained by a database trigger: true when any active variant is purchasable"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     # Search fields
     search_vector = SearchVectorField(null=True, blank=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -68,7 +152,14 @@ class Product(models.Model):
             models.Index(fields=['is_active']),
             models.Index(fields=['is_featured']),
             models.Index(fields=['category']),
+            models.Index(fields=['created_at', 'id'], name='catalog_product_created_id'),
+            models.Index(
+                fields=['-created_at'],
+                name='catalog_product_in_stock_idx',
+                condition=Q(is_active=True, has_stock=True),
+            ),
             GinIndex(fields=['search_vector']),
+            GinIndex(fields=['name'], name='catalog_product_name_trgm', opclasses=['gin_trgm_ops']),
         ]
     
     def __str__(self):
@@ -82,17 +173,15 @@ class Product(models.Model):
     @property
     def price_range(self):
         """Get the price range for this product's variants."""
+        if hasattr(self, 'min_price'):
+            return format_price_range(self.min_price, self.max_price)
+        
         variants = self.variants.filter(is_active=True)
         if not variants.exists():
             return None
         
         prices = [v.price for v in variants]
-        min_price = min(prices)
-        max_price = max(prices)
-        
-        if min_price == max_price:
-            return f"${min_price}"
-        return f"${min_price} - ${max_price}"
+        return format_price_range(min(prices), max(prices))
 
 
 class ProductVariant(models.Model):
@@ -0,0 +1,193 @@
+"""
+Full-text search for the product catalog.
+
+``Product.search_vector`` is maintained by the ``catalog_product_search_vector``
+trigger (see migration 0002) on every insert/update, including bulk writes.
+``update_search_vectors`` rebuilds it in batches for existing rows.
+
+Typeahead suggestions use the ``pg_trgm`` GIN indexes on ``Product.name`` and
+``Category.name`` and are memoized per prefix in a small in-process LRU.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection, transaction, OperationalError
+from django.db.models import F
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'english'
+
+# Weighted document: name > short_description > description > attribute values.
+# Keep in sync with the trigger function in migration 0002.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(short_description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C') || "
+    "setweight(jsonb_to_tsvector('english', coalesce(attributes, '{}'::jsonb), '[\"string\"]'), 'D')"
+)
+
+
+def build_search_query(value):
+    """Build a SearchQuery from user input (supports quotes, OR and -term)."""
+    return SearchQuery(value, search_type='websearch', config=SEARCH_CONFIG)
+
+
+def filter_products(queryset, value):
+    """Restrict a product queryset to full-text matches using the GIN index."""
+    return queryset.filter(search_vector=build_search_query(value))
+
+
+def search_products(queryset, value):
+    """Full-text match a product queryset and order it by relevance."""
+    query = build_search_query(value)
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query)
+    ).order_by('-rank', '-created_at')
+
+
+def update_search_vectors(batch_size=1000):
+    """Rebuild search_vector for all products in primary key batches."""
+    table = Product._meta.db_table
+    last_id = 0
+    updated = 0
+
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} SET search_vector = {SEARCH_VECTOR_SQL}
+                WHERE id IN (
+                    SELECT id FROM {table} WHERE id > %s ORDER BY id LIMIT %s
+                )
+                RETURNING id
+                """,
+                [last_id, batch_size],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+        if not ids:
+            return updated
+
+        updated += len(ids)
+        last_id = max(ids)
+
+
+# Typeahead settings
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_TIMEOUT_MS = 150
+SUGGEST_CACHE_SIZE = 1024
+SUGGEST_CACHE_TTL = 60  # seconds
+
+
+class SuggestionCache:
+    """Thread-safe LRU cache with a TTL for hot typeahead prefixes."""
+
+    def __init__(self, maxsize=SUGGEST_CACHE_SIZE, ttl=SUGGEST_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+suggestion_cache = SuggestionCache()
+
+
+def normalize_suggest_term(value):
+    """Lowercase and collapse whitespace so equivalent prefixes share a cache entry."""
+    return ' '.join((value or '').lower().split())
+
+
+def _match_names(queryset, term, limit):
+    return list(
+        queryset.filter(name__trigram_word_similar=term)
+        .annotate(similarity=TrigramWordSimilarity(term, 'name'))
+        .order_by('-similarity', 'name')
+        .values('id', 'name', 'slug')[:limit]
+    )
+
+
+@contextmanager
+def _statement_timeout(milliseconds):
+    """
+    Run the block in a savepoint under a statement timeout.
+
+    Inside an outer transaction ``SET LOCAL`` would outlive the block, so the
+    previous value is put back on the way out.
+    """
+    previous = None
+    if connection.in_atomic_block:
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            previous = cursor.fetchone()[0]
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [milliseconds])
+            yield
+    finally:
+        if previous is not None:
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [previous])
+
+
+def get_suggestions(value, limit=SUGGEST_DEFAULT_LIMIT):
+    """
+    Return the top product and category name matches for a typeahead prefix.
+
+    Queries run under a statement timeout; if the budget is exceeded the
+    request gets empty suggestions rather than waiting on the database.
+    """
+    term = normalize_suggest_term(value)
+    limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+    if len(term) < SUGGEST_MIN_LENGTH:
+        return {'query': term, 'products': [], 'categories': []}
+
+    key = (term, limit)
+    cached = suggestion_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        with _statement_timeout(SUGGEST_TIMEOUT_MS):
+            suggestions = {
+                'query': term,
+                'products': _match_names(Product.objects.filter(is_active=True), term, limit),
+                'categories': _match_names(Category.objects.filter(is_active=True), term, limit),
+            }
+    except OperationalError as e:
+        logger.warning(f"Suggestion lookup for '{term}' exceeded budget: {e}")
+        return {'query': term, 'products': [], 'categories': []}
+
+    suggestion_cache.set(key, suggestions)
+    return suggestions
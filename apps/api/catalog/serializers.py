@@ -19,6 +19,19 @@ class ProductImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image', 'alt_text', 'is_primary', 'sort_order']
 
 
+def annotated_image_data(data, request=None):
+    """Turn a ``JSONObject`` image annotation into API data with an absolute URL."""
+    if not data:
+        return None
+    
+    data = dict(data)
+    url = ProductImage._meta.get_field('image').storage.url(data['image']) if data['image'] else None
+    if url and request is not None:
+        url = request.build_absolute_uri(url)
+    data['image'] = url
+    return data
+
+
 class ProductVariantSerializer(serializers.ModelSerializer):
     """Serializer for ProductVariant model."""
     
@@ -39,7 +52,7 @@ class ProductListSerializer(serializers.ModelSerializer):
     """Serializer for Product list view (optimized for listing)."""
     
     category = CategorySerializer(read_only=True)
-    primary_image = ProductImageSerializer(read_only=True)
+    primary_image = serializers.SerializerMethodField()
     price_range = serializers.ReadOnlyField()
     variant_count = serializers.SerializerMethodField()
     
@@ -51,7 +64,17 @@ class ProductListSerializer(serializers.ModelSerializer):
             'created_at', 'variant_count'
         ]
     
+    def get_primary_image(self, obj):
+        """Use the annotated primary image when the queryset provides it."""
+        if not hasattr(obj, 'primary_image_data'):
+            image = obj.primary_image
+            return ProductImageSerializer(image, context=self.context).data if image else None
+        
+        return annotated_image_data(obj.primary_image_data, self.context.get('request'))
+    
     def get_variant_count(self, obj):
+        if hasattr(obj, 'active_variant_count'):
+            return obj.active_variant_count
         return obj.variants.filter(is_active=True).count()
 
 
@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from api.performance import invalidate_on_change
+from .cache import bump_category_tree_version, bump_product_versions
+from .models import Category, Product, ProductVariant, ProductImage
+
+invalidate_on_change(Category)
+invalidate_on_change(Product, related=['category'])
+invalidate_on_change(ProductVariant, related=['product'], own_tags=False)
+invalidate_on_change(ProductImage, related=['product'], own_tags=False)
+
+
+def _bump_now_and_on_commit(func, *args):
+    # Bump now for readers inside this transaction and again after commit so
+    # a concurrent rebuild from pre-commit data is not served until expiry.
+    func(*args)
+    transaction.on_commit(lambda: func(*args))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_category_tree(sender, **kwargs):
+    """Bump the category tree version when categories or product counts change."""
+    _bump_now_and_on_commit(bump_category_tree_version)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_detail(sender, instance, **kwargs):
+    """Bump the product version when a product changes."""
+    _bump_now_and_on_commit(bump_product_versions, [instance.pk])
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_detail_children(sender, instance, **kwargs):
+    """Bump the parent product version when a variant or image changes."""
+    _bump_now_and_on_commit(bump_product_versions, [instance.product_id])
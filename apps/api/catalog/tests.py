@@ -1,9 +1,21 @@
+from django.core.cache import caches
+from django.db import InternalError, connection, transaction
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from decimal import Decimal
 from .models import Category, Product, ProductVariant, ProductImage
+from .serializers import ProductListSerializer
+from .facets import compute_facets
+from .filters import ProductFilter
+from .cache import get_category_tree, get_category_tree_version
+from .search import search_products, update_search_vectors, get_suggestions, suggestion_cache
+from accounts.models import User
+from api.performance import (
+    model_tag, get_tag_versions, get_tagged, set_tagged, invalidate_tags, invalidate_related_cache,
+)
 
 
 class CategoryModelTest(TestCase):
@@ -64,6 +76,578 @@ class ProductModelTest(TestCase):
         self.assertEqual(self.product.price_range, '$99.99 - $149.99')
 
 
+class ProductListingDataTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(
+            name='Electronics',
+            slug='electronics'
+        )
+        for index in range(3):
+            product = Product.objects.create(
+                name=f'Product {index}',
+                slug=f'product-{index}',
+                description='A test product',
+                category=self.category
+            )
+            ProductVariant.objects.create(
+                product=product,
+                sku=f'TEST-{index}-A',
+                price=Decimal('10.00'),
+                stock_quantity=5
+            )
+            ProductVariant.objects.create(
+                product=product,
+                sku=f'TEST-{index}-B',
+                price=Decimal('20.00'),
+                stock_quantity=5
+            )
+            ProductVariant.objects.create(
+                product=product,
+                sku=f'TEST-{index}-C',
+                price=Decimal('99.00'),
+                stock_quantity=5,
+                is_active=False
+            )
+            ProductImage.objects.create(
+                product=product,
+                image=f'products/product-{index}.jpg',
+                is_primary=True
+            )
+    
+    def test_listing_annotations(self):
+        product = Product.objects.with_listing_data().get(slug='product-0')
+        self.assertEqual(product.min_price, Decimal('10.00'))
+        self.assertEqual(product.max_price, Decimal('20.00'))
+        self.assertEqual(product.active_variant_count, 2)
+        self.assertEqual(product.price_range, '$10.00 - $20.00')
+        self.assertEqual(product.primary_image_data['image'], 'products/product-0.jpg')
+    
+    def test_listing_annotations_without_variants(self):
+        product = Product.objects.create(
+            name='Empty Product',
+            slug='empty-product',
+            description='No variants',
+            category=self.category
+        )
+        product = Product.objects.with_listing_data().get(pk=product.pk)
+        self.assertIsNone(product.price_range)
+        self.assertEqual(product.active_variant_count, 0)
+        self.assertIsNone(product.primary_image_data)
+    
+    def test_list_serializer_query_count_is_constant(self):
+        queryset = Product.objects.select_related('category').with_listing_data()
+        with self.assertNumQueries(1):
+            data = ProductListSerializer(queryset, many=True).data
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0]['variant_count'], 2)
+        self.assertTrue(data[0]['primary_image']['image'].endswith('.jpg'))
+
+
+class ProductSearchTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(
+            name='Audio',
+            slug='audio'
+        )
+        self.name_match = Product.objects.create(
+            name='Wireless Headphones',
+            slug='wireless-headphones',
+            description='Over-ear audio',
+            category=self.category
+        )
+        self.description_match = Product.objects.create(
+            name='Travel Case',
+            slug='travel-case',
+            description='Fits most headphones',
+            category=self.category
+        )
+        self.attribute_match = Product.objects.create(
+            name='Speaker',
+            slug='speaker',
+            description='Portable speaker',
+            category=self.category,
+            attributes={'color': 'crimson'}
+        )
+    
+    def test_search_vector_maintained_on_write(self):
+        self.name_match.refresh_from_db()
+        self.assertIsNotNone(self.name_match.search_vector)
+        
+        Product.objects.filter(pk=self.description_match.pk).update(name='Headphone Stand')
+        results = search_products(Product.objects.all(), 'stand')
+        self.assertEqual(list(results), [self.description_match])
+    
+    def test_search_ranks_name_matches_first(self):
+        results = list(search_products(Product.objects.all(), 'headphones'))
+        self.assertEqual(results, [self.name_match, self.description_match])
+    
+    def test_search_matches_attribute_values(self):
+        results = list(search_products(Product.objects.all(), 'crimson'))
+        self.assertEqual(results, [self.attribute_match])
+    
+    def test_update_search_vectors(self):
+        Product.objects.update(search_vector=None)
+        self.assertEqual(update_search_vectors(batch_size=2), 3)
+        self.assertFalse(Product.objects.filter(search_vector__isnull=True).exists())
+
+
+class ProductSuggestTest(APITestCase):
+    def setUp(self):
+        suggestion_cache.clear()
+        self.category = Category.objects.create(
+            name='Headphones',
+            slug='headphones'
+        )
+        Product.objects.create(
+            name='Wireless Headphones',
+            slug='wireless-headphones',
+            description='Over-ear audio',
+            category=self.category
+        )
+        Product.objects.create(
+            name='Wired Earbuds',
+            slug='wired-earbuds',
+            description='In-ear audio',
+            category=self.category
+        )
+        Product.objects.create(
+            name='Garden Hose',
+            slug='garden-hose',
+            description='Twenty meters',
+            category=self.category
+        )
+    
+    def test_suggestions_match_prefix_and_typos(self):
+        suggestions = get_suggestions('headph')
+        self.assertEqual([p['slug'] for p in suggestions['products']], ['wireless-headphones'])
+        self.assertEqual([c['slug'] for c in suggestions['categories']], ['headphones'])
+        
+        suggestions = get_suggestions('hedphones')
+        self.assertIn('wireless-headphones', [p['slug'] for p in suggestions['products']])
+    
+    def test_timeout_does_not_leak_into_outer_transaction(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            before = cursor.fetchone()[0]
+            get_suggestions('headph')
+            cursor.execute('SHOW statement_timeout')
+            self.assertEqual(cursor.fetchone()[0], before)
+    
+    def test_short_prefix_returns_nothing(self):
+        with self.assertNumQueries(0):
+            suggestions = get_suggestions('w')
+        self.assertEqual(suggestions['products'], [])
+    
+    def test_hot_prefixes_are_cached(self):
+        first = get_suggestions('Garden ')
+        with self.assertNumQueries(0):
+            second = get_suggestions('garden')
+        self.assertEqual(first, second)
+    
+    def test_suggest_endpoint(self):
+        self.client.force_authenticate(user=User(email='shopper@example.com'))
+        response = self.client.get(reverse('product-suggest'), {'q': 'garden', 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['slug'] for p in response.data['products']], ['garden-hose'])
+
+
+class ProductFacetTest(APITestCase):
+    def setUp(self):
+        self.audio = Category.objects.create(name='Audio', slug='audio')
+        self.laptops = Category.objects.create(name='Laptops', slug='laptops')
+        self.create_product('speaker', self.audio, {'color': 'Red', 'brand': 'Acme'}, ['10.00', '30.00'], stock=5)
+        self.create_product('headphones', self.audio, {'color': 'Red'}, ['40.00'], stock=0)
+        self.create_product('laptop', self.laptops, {'color': 'Blue'}, ['900.00'], stock=2)
+    
+    def create_product(self, slug, category, attributes, prices, stock):
+        product = Product.objects.create(
+            name=slug.title(),
+            slug=slug,
+            description='A test product',
+            category=category,
+            attributes=attributes
+        )
+        for index, price in enumerate(prices):
+            ProductVariant.objects.create(
+                product=product,
+                sku=f'{slug}-{index}',
+                price=Decimal(price),
+                stock_quantity=stock
+            )
+        return product
+    
+    def test_compute_facets(self):
+        with self.assertNumQueries(1):
+            facets = compute_facets(Product.objects.all())
+        
+        self.assertEqual(
+            [(c['slug'], c['count']) for c in facets['category']],
+            [('audio', 2), ('laptops', 1)]
+        )
+        self.assertEqual(
+            [(p['key'], p['count']) for p in facets['price']],
+            [('0-25', 1), ('25-50', 1), ('500+', 1)]
+        )
+        self.assertEqual(facets['color'], [{'value': 'Red', 'count': 2}, {'value': 'Blue', 'count': 1}])
+        self.assertEqual(facets['brand'], [{'value': 'Acme', 'count': 1}])
+        self.assertEqual(facets['in_stock'], {'true': 2, 'false': 1})
+    
+    def test_facets_ignore_join_duplicates(self):
+        facets = compute_facets(Product.objects.filter(variants__price__gte=0))
+        self.assertEqual(sum(c['count'] for c in facets['category']), 3)
+    
+    def test_list_returns_facets_on_request(self):
+        self.client.force_authenticate(user=User(email='shopper@example.com'))
+        url = reverse('product-list')
+        
+        response = self.client.get(url, {'category_slug': 'audio', 'facets': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['facets']['category'][0]['count'], 2)
+        
+        response = self.client.get(url)
+        self.assertNotIn('facets', response.data)
+
+
+class ProductHasStockTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(
+            name='Electronics',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='Test Product',
+            slug='test-product',
+            description='A test product',
+            category=self.category
+        )
+    
+    def has_stock(self):
+        return Product.objects.values_list('has_stock', flat=True).get(pk=self.product.pk)
+    
+    def test_has_stock_follows_variant_writes(self):
+        self.assertFalse(self.has_stock())
+        
+        variant = ProductVariant.objects.create(
+            product=self.product,
+            sku='TEST-001',
+            price=Decimal('10.00'),
+            stock_quantity=2
+        )
+        self.assertTrue(self.has_stock())
+        
+        ProductVariant.objects.filter(pk=variant.pk).update(stock_quantity=0)
+        self.assertFalse(self.has_stock())
+        
+        variant.refresh_from_db()
+        variant.track_inventory = False
+        variant.save()
+        self.assertTrue(self.has_stock())
+        
+        variant.delete()
+        self.assertFalse(self.has_stock())
+    
+    def test_stale_product_save_keeps_has_stock(self):
+        ProductVariant.objects.create(
+            product=self.product,
+            sku='TEST-001',
+            price=Decimal('10.00'),
+            stock_quantity=2
+        )
+        self.product.name = 'Renamed Product'
+        self.product.save()
+        self.assertTrue(self.has_stock())
+    
+    def test_in_stock_filter_composes_with_ordering(self):
+        ProductVariant.objects.create(
+            product=self.product,
+            sku='TEST-001',
+            price=Decimal('10.00'),
+            stock_quantity=2
+        )
+        ProductVariant.objects.create(
+            product=self.product,
+            sku='TEST-002',
+            price=Decimal('20.00'),
+            stock_quantity=3
+        )
+        out_of_stock = Product.objects.create(
+            name='Sold Out',
+            slug='sold-out',
+            description='Nothing left',
+            category=self.category
+        )
+        ProductVariant.objects.create(
+            product=out_of_stock,
+            sku='TEST-003',
+            price=Decimal('10.00'),
+            stock_quantity=0
+        )
+        
+        filterset = ProductFilter({'in_stock': True}, queryset=Product.objects.all())
+        queryset = filterset.qs.order_by('name').filter(is_active=True)
+        self.assertEqual(list(queryset), [self.product])
+
+
+class ProductKeysetPaginationTest(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(
+            name='Electronics',
+            slug='electronics'
+        )
+        for index in range(5):
+            Product.objects.create(
+                name=f'Product {index}',
+                slug=f'product-{index}',
+                description='A test product',
+                category=self.category
+            )
+        # Ties on created_at must be broken by id
+        Product.objects.update(created_at=timezone.now())
+        self.client.force_authenticate(user=User(email='shopper@example.com'))
+    
+    def test_cursor_walks_all_pages(self):
+        url = reverse('product-list')
+        response = self.client.get(url, {'cursor': '', 'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        
+        seen = [p['id'] for p in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen.extend(p['id'] for p in response.data['results'])
+        
+        expected = list(Product.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+    
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get(reverse('product-list'))
+        self.assertEqual(response.data['count'], 5)
+    
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('product-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_ordering_is_rejected_in_cursor_mode(self):
+        response = self.client.get(reverse('product-list'), {'cursor': '', 'ordering': 'name'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', response.data)
+        
+        response = self.client.get(reverse('product-list'), {'ordering': 'name'})
+        self.assertEqual(response.data['results'][0]['name'], 'Product 0')
+
+
+class CategoryPathTest(APITestCase):
+    """Test the trigger-maintained materialized category path."""
+    
+    def setUp(self):
+        self.root = Category.objects.create(name='Electronics', slug='electronics')
+        self.phones = Category.objects.create(name='Phones', slug='phones', parent=self.root)
+        self.android = Category.objects.create(name='Android', slug='android', parent=self.phones)
+        self.other = Category.objects.create(name='Books', slug='books')
+        for i, category in enumerate([self.root, self.phones, self.android, self.other]):
+            Product.objects.create(
+                name=f'Product {i}', slug=f'product-{i}', description='Test',
+                category=category,
+            )
+    
+    def test_path_maintained_on_insert(self):
+        self.assertEqual(self.root.path, f'/{self.root.id}/')
+        self.assertEqual(self.android.path, f'/{self.root.id}/{self.phones.id}/{self.android.id}/')
+        self.assertEqual(self.android.ancestor_ids, [self.root.id, self.phones.id])
+        self.assertEqual(self.android.depth, 2)
+    
+    def test_move_rewrites_subtree(self):
+        self.phones.parent = self.other
+        self.phones.save()
+        self.android.refresh_from_db()
+        self.assertEqual(self.android.path, f'/{self.other.id}/{self.phones.id}/{self.android.id}/')
+        self.assertEqual(self.android.full_path, 'Books > Phones > Android')
+    
+    def test_stale_instance_save_keeps_path(self):
+        stale = Category.objects.get(pk=self.android.pk)
+        self.phones.parent = None
+        self.phones.save()
+        stale.name = 'Android Phones'
+        stale.save()
+        self.assertEqual(stale.path, f'/{self.phones.id}/{self.android.id}/')
+    
+    def test_cycle_rejected(self):
+        self.root.parent = self.android
+        with self.assertRaises(InternalError):
+            with transaction.atomic():
+                self.root.save()
+    
+    def test_full_path_single_query(self):
+        android = Category.objects.get(pk=self.android.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(android.full_path, 'Electronics > Phones > Android')
+    
+    def test_descendants(self):
+        self.assertEqual(
+            set(self.phones.get_descendants().values_list('slug', flat=True)), {'phones', 'android'}
+        )
+        self.assertEqual(
+            list(self.phones.get_descendants(include_self=False).values_list('slug', flat=True)), ['android']
+        )
+    
+    def test_category_slug_filter_includes_descendants(self):
+        products = ProductFilter({'category_slug': 'electronics'}, queryset=Product.objects.all()).qs
+        self.assertEqual(set(products.values_list('slug', flat=True)), {'product-0', 'product-1', 'product-2'})
+        products = ProductFilter({'category_slug': 'missing'}, queryset=Product.objects.all()).qs
+        self.assertFalse(products.exists())
+
+
+class CategoryTreeCacheTest(APITestCase):
+    """Test the versioned category tree cache."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+        self.root = Category.objects.create(name='Electronics', slug='electronics')
+        self.child = Category.objects.create(name='Phones', slug='phones', parent=self.root)
+        self.hidden = Category.objects.create(name='Archive', slug='archive', is_active=False)
+        for i, category in enumerate([self.root, self.child, self.child]):
+            Product.objects.create(
+                name=f'Product {i}', slug=f'product-{i}', description='Test',
+                category=category,
+            )
+        self.client.force_authenticate(user=User(email='shopper@example.com'))
+    
+    def test_tree_is_materialized(self):
+        nodes = {node['slug']: node for node in get_category_tree()['nodes']}
+        self.assertEqual(nodes['phones']['path'], 'Electronics > Phones')
+        self.assertEqual(nodes['phones']['depth'], 1)
+        self.assertEqual(nodes['phones']['ancestors'], [self.root.id])
+        self.assertEqual(nodes['phones']['product_count'], 2)
+        self.assertEqual(nodes['electronics']['product_count'], 1)
+        self.assertEqual(nodes['electronics']['total_product_count'], 3)
+    
+    def test_cached_reads_skip_database(self):
+        get_category_tree()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('category-list'))
+        self.assertEqual([c['slug'] for c in response.data], ['electronics', 'phones'])
+    
+    def test_shared_cache_fallback(self):
+        get_category_tree()
+        caches['local'].clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_category_tree()['nodes']), 3)
+    
+    def test_save_and_delete_bump_version(self):
+        get_category_tree()
+        version = get_category_tree_version()
+        self.child.name = 'Mobile Phones'
+        self.child.save()
+        self.assertGreater(get_category_tree_version(), version)
+        nodes = {node['slug']: node for node in get_category_tree()['nodes']}
+        self.assertEqual(nodes['phones']['path'], 'Electronics > Mobile Phones')
+        
+        self.hidden.delete()
+        self.assertNotIn('archive', [node['slug'] for node in get_category_tree()['nodes']])
+    
+    def test_category_tree_endpoint(self):
+        response = self.client.get(reverse('category-tree'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['slug'], 'electronics')
+        self.assertEqual([c['slug'] for c in response.data[0]['children']], ['phones'])
+
+
+class ProductDetailCacheTest(APITestCase):
+    """Test cached product detail responses and conditional GET."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            name='Phone', slug='phone', description='Test', category=self.category
+        )
+        self.variant = ProductVariant.objects.create(
+            product=self.product, sku='PHONE-1', price=Decimal('199.00'), stock_quantity=5
+        )
+        self.url = reverse('product-detail', kwargs={'slug': 'phone'})
+        self.client.force_authenticate(user=User(email='shopper@example.com'))
+    
+    def test_cached_response_skips_database(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+    
+    def test_conditional_get_returns_not_modified(self):
+        first = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_variant_write_invalidates(self):
+        first = self.client.get(self.url)
+        self.variant.stock_quantity = 2
+        self.variant.save(update_fields=['stock_quantity'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['variants'][0]['stock_quantity'], 2)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+    
+    def test_deactivated_product_not_served_from_cache(self):
+        self.client.get(self.url)
+        self.product.is_active = False
+        self.product.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TaggedCacheTest(APITestCase):
+    """Test tag-based cache invalidation driven by catalog model signals."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        self.product = Product.objects.create(
+            name='Phone', slug='phone', description='Test', category=self.category
+        )
+    
+    def test_instance_and_model_tags(self):
+        self.assertEqual(model_tag(self.product), f'product:{self.product.pk}')
+        self.assertEqual(model_tag(Product), 'product:*')
+        
+        for tags in ([f'product:{self.product.pk}'], ['product:*'], [f'category:{self.category.pk}']):
+            set_tagged('tagged-test', 'value', get_tag_versions(tags))
+            self.assertEqual(get_tagged('tagged-test'), 'value')
+            ProductVariant.objects.create(product=self.product, sku=f'SKU-{tags[0]}', price=Decimal('5.00'))
+            if tags[0].startswith('category'):
+                self.assertEqual(get_tagged('tagged-test'), 'value')
+                self.category.save()
+            self.assertIsNone(get_tagged('tagged-test'))
+    
+    def test_unrelated_instance_keeps_entry(self):
+        other = Product.objects.create(name='Other', slug='other', description='Test', category=self.category)
+        set_tagged('tagged-test', 'value', get_tag_versions([f'product:{self.product.pk}']))
+        other.save()
+        self.assertEqual(get_tagged('tagged-test'), 'value')
+        invalidate_related_cache(self.product)
+        self.assertIsNone(get_tagged('tagged-test'))
+    
+    def test_cache_response_decorator(self):
+        self.client.force_authenticate(user=User(email='admin@example.com', is_staff=True))
+        url = reverse('revenue-trend')
+        first = self.client.get(url, {'days': 0})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, {'days': 0}).data, first.data)
+        with self.assertNumQueries(4):
+            self.client.get(url, {'days': 1})
+        invalidate_tags('order:*')
+        with self.assertNumQueries(2):
+            self.client.get(url, {'days': 0})
+
+
 class ProductAPITest(APITestCase):
     def setUp(self):
         self.category = Category.objects.create(
@@ -3,8 +3,10 @@ from . import views
 
 urlpatterns = [
     path('categories/', views.CategoryListView.as_view(), name='category-list'),
+    path('categories/tree/', views.category_tree, name='category-tree'),
     path('products/', views.ProductListView.as_view(), name='product-list'),
     path('products/search/', views.ProductSearchView.as_view(), name='product-search'),
+    path('products/suggest/', views.product_suggestions, name='product-suggest'),
     path('products/<slug:slug>/', views.ProductDetailView.as_view(), name='product-detail'),
     path('performance/', views.performance_metrics, name='performance-metrics'),
 ]
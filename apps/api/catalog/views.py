@@ -2,54 +2,87 @@ from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, F, Count
+from django.db.models import Q, F, Count, prefetch_related_objects
 from django.utils import timezone
 from django.db import connection
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from .models import Category, Product, ProductVariant
 from .serializers import CategorySerializer, ProductListSerializer, ProductDetailSerializer
 from .filters import ProductFilter
+from .facets import compute_facets
+from .cache import (
+    get_active_categories, get_active_category_tree,
+    get_cached_product_detail, get_product_detail_versions, cache_product_detail,
+)
+from api.pagination import PageNumberOrKeysetPagination
+from .search import search_products, get_suggestions, SUGGEST_DEFAULT_LIMIT
 
 
 class CategoryListView(generics.ListAPIView):
-    """List all active categories."""
+    """List all active categories from the cached category tree."""
     
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     pagination_class = None
+    
+    def list(self, request, *args, **kwargs):
+        return Response(get_active_categories())
+
+
+@api_view(['GET'])
+def category_tree(request):
+    """Get the nested tree of active categories with paths and product counts."""
+    return Response(get_active_category_tree())
+
 
+class FacetedListMixin:
+    """Include facet counts in list responses when ``?facets=true`` is passed."""
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets', '').lower() in ('1', 'true', 'yes'):
+            response.data['facets'] = compute_facets(self.filter_queryset(self.get_queryset()))
+        return response
 
-class ProductListView(generics.ListAPIView):
+
+class ProductListView(FacetedListMixin, generics.ListAPIView):
     """List products with filtering, searching, and pagination."""
     
-    queryset = Product.objects.select_related('category').prefetch_related(
-        'images', 'variants'
-    ).filter(is_active=True)
+    queryset = Product.objects.select_related('category').with_listing_data().filter(is_active=True)
     serializer_class = ProductListSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = PageNumberOrKeysetPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_class = ProductFilter
-    search_fields = ['name', 'description', 'short_description']
-    ordering_fields = ['name', 'created_at', 'price_range']
+    ordering_fields = ['name', 'created_at', 'min_price', 'max_price']
     ordering = ['-created_at']
-    
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        
-        # Add search vector filtering if search query exists
-        search_query = self.request.query_params.get('search')
-        if search_query:
-            queryset = queryset.filter(search_vector__icontains=search_query)
-        
-        return queryset
 
 
 class ProductDetailView(generics.RetrieveAPIView):
-    """Retrieve a single product by slug."""
+    """Retrieve a single product by slug, with cached payloads and conditional GET."""
     
-    queryset = Product.objects.select_related('category').prefetch_related(
-        'images', 'variants'
-    ).filter(is_active=True)
+    queryset = Product.objects.select_related('category').filter(is_active=True)
     serializer_class = ProductDetailSerializer
     lookup_field = 'slug'
+    
+    def retrieve(self, request, *args, **kwargs):
+        slug = self.kwargs[self.lookup_field]
+        host = request.get_host()
+        entry = get_cached_product_detail(slug, host)
+        if entry is None:
+            product = self.get_object()
+            versions = get_product_detail_versions(product.pk)
+            prefetch_related_objects([product], 'images', 'variants')
+            data = self.get_serializer(product).data
+            entry = cache_product_detail(slug, host, product, data, versions)
+        
+        response = get_conditional_response(
+            request, etag=entry['etag'], last_modified=entry['last_modified']
+        ) or Response(entry['data'])
+        response.headers['ETag'] = entry['etag']
+        response.headers['Last-Modified'] = http_date(entry['last_modified'])
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        return response
 
 
 @api_view(['GET'])
@@ -67,12 +100,10 @@ def performance_metrics(request):
     })
 
 
-class ProductSearchView(generics.ListAPIView):
+class ProductSearchView(FacetedListMixin, generics.ListAPIView):
     """Advanced product search with full-text search."""
     
-    queryset = Product.objects.select_related('category').prefetch_related(
-        'images', 'variants'
-    ).filter(is_active=True)
+    queryset = Product.objects.select_related('category').with_listing_data().filter(is_active=True)
     serializer_class = ProductListSerializer
     
     def get_queryset(self):
@@ -80,7 +111,18 @@ class ProductSearchView(generics.ListAPIView):
         search_query = self.request.query_params.get('q')
         
         if search_query:
-            # Use PostgreSQL full-text search
-            queryset = queryset.filter(search_vector__icontains=search_query)
+            # Use PostgreSQL full-text search, most relevant first
+            queryset = search_products(queryset, search_query)
         
-        return queryset
\ No newline at end of file
+        return queryset
+
+
+@api_view(['GET'])
+def product_suggestions(request):
+    """Typeahead suggestions for product and category names."""
+    try:
+        limit = int(request.query_params.get('limit', SUGGEST_DEFAULT_LIMIT))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(get_suggestions(request.query_params.get('q', ''), limit))
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import StockAdjustment, LowStockAlert, InventoryReport, StockMovement
+from .models import StockAdjustment, LowStockAlert, InventoryReport, StockMovement, StockReservation
 
 
 @admin.register(StockAdjustment)
@@ -79,4 +79,14 @@ class StockMovementAdmin(admin.ModelAdmin):
         ('Timestamps', {
             'fields': ('created_at',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = [
+        'order', 'variant', 'quantity', 'status', 'expires_at', 'created_at'
+    ]
+    list_filter = ['status', 'expires_at']
+    search_fields = ['variant__sku', 'order__order_number']
+    readonly_fields = ['order', 'variant', 'quantity', 'created_at', 'released_at']
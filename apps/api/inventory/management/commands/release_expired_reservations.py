@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from inventory.stock import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Cancel unpaid orders with expired stock holds and return the stock'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of orders to release per transaction (default: 100)'
+        )
+        parser.add_argument(
+            '--continuous',
+            action='store_true',
+            help='Keep running, sleeping between passes',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=30,
+            help='Seconds to sleep between passes in continuous mode (default: 30)'
+        )
+    
+    def handle(self, *args, **options):
+        while True:
+            orders = units = 0
+            for cancelled, released in release_expired_reservations(batch_size=options['batch_size']):
+                orders += cancelled
+                units += released
+            
+            self.stdout.write(
+                self.style.SUCCESS(f'Cancelled {orders} expired orders and released {units} units')
+            )
+            if not options['continuous']:
+                return
+            time.sleep(options['sleep'])
@@ -129,6 +129,7 @@ class StockMovement(models.Model):
         ('transfer', 'Transfer'),
         ('damage', 'Damage'),
         ('theft', 'Theft'),
+        ('release', 'Reservation Release'),
     ]
     
     variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='stock_movements')
@@ -144,7 +145,44 @@ class StockMovement(models.Model):
             models.Index(fields=['variant']),
             models.Index(fields=['movement_type']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['created_at', 'id'], name='inventory_movement_created_id'),
         ]
     
     def __str__(self):
-        return f"{self.get_movement_type_display()} - {self.variant.sku} ({self.quantity:+d})"
\ No newline at end of file
+        return f"{self.get_movement_type_display()} - {self.variant.sku} ({self.quantity:+d})"
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for an order awaiting payment.
+    
+    The held units are already taken out of ``ProductVariant.stock_quantity``
+    (so it stays the available-to-sell figure); on-hand stock is
+    ``stock_quantity`` plus active holds. Paying commits the hold, while
+    cancellation or expiry releases it back to stock.
+    """
+    
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+    ]
+    
+    order = models.ForeignKey('orders.Order', on_delete=models.CASCADE, related_name='reservations')
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    released_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['expires_at']
+        indexes = [
+            models.Index(fields=['order']),
+            models.Index(fields=['variant', 'status']),
+            models.Index(fields=['status', 'expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity}x {self.variant.sku} for {self.order} ({self.status})"
@@ -82,6 +82,8 @@ class StockLevelSerializer(serializers.Serializer):
     sku = serializers.CharField()
     product_name = serializers.CharField()
     current_stock = serializers.IntegerField()
+    reserved = serializers.IntegerField()
+    on_hand = serializers.IntegerField()
     threshold = serializers.IntegerField()
     status = serializers.CharField()
     last_movement = serializers.DateTimeField()
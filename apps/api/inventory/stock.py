@@ -0,0 +1,203 @@
+"""
+Atomic stock decrements.
+
+Stock is taken with one conditional ``UPDATE ... SET stock_quantity =
+stock_quantity - n WHERE stock_quantity >= n`` per variant, so concurrent
+checkouts can never drive it below zero and no Python-side check can go stale.
+Variants are updated in id order, so two orders sharing variants lock them in
+the same order and cannot deadlock. Every variant is tried before failing, so
+all shortfalls are reported at once; the caller's transaction rolls back the
+decrements that did succeed.
+
+Orders awaiting payment keep their stock as ``StockReservation`` holds. A hold
+is committed when the order is paid and released back to stock when the order
+is cancelled or the hold expires (see ``release_expired_reservations`` and the
+``release_expired_reservations`` command).
+"""
+
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+from django.utils import timezone
+from catalog.cache import bump_product_versions
+from catalog.models import ProductVariant
+from orders.models import Order
+from api.performance import invalidate_tags, model_tag
+from .models import StockMovement, StockReservation
+
+
+class InsufficientStock(Exception):
+    """Raised with every line that could not be fulfilled."""
+    
+    def __init__(self, shortfalls):
+        super().__init__('Some items are out of stock')
+        self.shortfalls = shortfalls
+
+
+def decrement_stock(lines, reference='', movement_type='sale'):
+    """
+    Take stock for ``(variant, quantity)`` lines and record the movements.
+    
+    Must run inside a transaction. Raises ``InsufficientStock`` listing
+    ``variant_id``, ``name``, ``requested`` and ``available`` for each line
+    that is inactive or short; otherwise returns the created movements.
+    """
+    requested = Counter()
+    variants = {}
+    for variant, quantity in lines:
+        requested[variant.pk] += quantity
+        variants[variant.pk] = variant
+    
+    now = timezone.now()
+    failed = []
+    for variant_id in sorted(requested):
+        quantity = requested[variant_id]
+        updated = ProductVariant.objects.filter(
+            Q(track_inventory=False) | Q(stock_quantity__gte=quantity),
+            pk=variant_id,
+            is_active=True,
+        ).update(
+            stock_quantity=Case(
+                When(track_inventory=True, then=F('stock_quantity') - quantity),
+                default=F('stock_quantity'),
+                output_field=PositiveIntegerField(),
+            ),
+            updated_at=now,
+        )
+        if not updated:
+            failed.append(variant_id)
+    
+    if failed:
+        current = ProductVariant.objects.in_bulk(failed)
+        raise InsufficientStock([
+            {
+                'variant_id': variant_id,
+                'name': variants[variant_id].display_name,
+                'requested': requested[variant_id],
+                'available': current[variant_id].stock_quantity
+                if variant_id in current and current[variant_id].is_active else 0,
+            }
+            for variant_id in failed
+        ])
+    
+    movements = StockMovement.objects.bulk_create([
+        StockMovement(
+            variant_id=variant_id,
+            movement_type=movement_type,
+            quantity=-requested[variant_id],
+            reference=reference,
+        )
+        for variant_id in sorted(requested)
+    ])
+    
+    _bump_products(variant.product_id for variant in variants.values())
+    return movements
+
+
+def _bump_products(product_ids):
+    # update() sends no signals; drop cached product pages now and after commit.
+    product_ids = set(product_ids)
+    bump_product_versions(product_ids)
+    transaction.on_commit(lambda: bump_product_versions(product_ids))
+
+
+def reserve_stock(order, lines, ttl=None):
+    """
+    Take stock for an order and hold it until the order is paid or expires.
+    
+    Must run inside the order transaction; raises ``InsufficientStock`` like
+    ``decrement_stock``.
+    """
+    lines = list(lines)
+    decrement_stock(lines, reference=order.order_number)
+    
+    requested = Counter()
+    for variant, quantity in lines:
+        requested[variant.pk] += quantity
+    expires_at = timezone.now() + timedelta(seconds=ttl or settings.STOCK_RESERVATION_TTL)
+    return StockReservation.objects.bulk_create([
+        StockReservation(order=order, variant_id=variant_id, quantity=quantity, expires_at=expires_at)
+        for variant_id, quantity in sorted(requested.items())
+    ])
+
+
+def commit_reservations(order_ids):
+    """Mark the active holds of paid orders as committed."""
+    return StockReservation.objects.filter(order_id__in=order_ids, status='active').update(status='committed')
+
+
+def release_reservations(order_ids):
+    """
+    Return the active holds of the given orders to stock.
+    
+    Holds are locked first, so a release racing with a commit or another
+    release of the same order applies at most once. Returns the number of
+    units released.
+    """
+    with transaction.atomic():
+        reservations = list(
+            StockReservation.objects.select_for_update()
+            .filter(order_id__in=order_ids, status='active')
+            .select_related('order', 'variant')
+            .order_by('variant_id', 'id')
+        )
+        if not reservations:
+            return 0
+        
+        released = Counter()
+        for reservation in reservations:
+            released[reservation.variant_id] += reservation.quantity
+        for variant_id in sorted(released):
+            ProductVariant.objects.filter(pk=variant_id, track_inventory=True).update(
+                stock_quantity=F('stock_quantity') + released[variant_id], updated_at=timezone.now()
+            )
+        
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                variant_id=reservation.variant_id,
+                movement_type='release',
+                quantity=reservation.quantity,
+                reference=reservation.order.order_number,
+            )
+            for reservation in reservations
+        ])
+        StockReservation.objects.filter(pk__in=[reservation.pk for reservation in reservations]).update(
+            status='released', released_at=timezone.now()
+        )
+        _bump_products(reservation.variant.product_id for reservation in reservations)
+    return sum(released.values())
+
+
+def release_expired_reservations(batch_size=100):
+    """
+    Cancel unpaid orders whose holds have expired and release their stock.
+    
+    Orders are claimed in batches with ``FOR UPDATE SKIP LOCKED``, so sweepers
+    never block each other and an order whose payment is being settled is left
+    for a later pass. Payments settle under the same row lock and never revive
+    a cancelled order (see ``payments.settlement``). Yields
+    ``(orders_cancelled, units_released)`` per batch.
+    """
+    while True:
+        with transaction.atomic():
+            expired = StockReservation.objects.filter(
+                status='active', expires_at__lt=timezone.now()
+            ).values('order_id')
+            orders = list(
+                Order.objects.select_for_update(skip_locked=True)
+                .filter(pk__in=expired, status='awaiting_payment')
+                .order_by('pk')[:batch_size]
+            )
+            if not orders:
+                return
+            
+            order_ids = [order.pk for order in orders if order.can_transition_to('cancelled')]
+            units = release_reservations(order_ids)
+            # update() skips Order signals; the holds are already released here.
+            Order.objects.filter(pk__in=order_ids).update(status='cancelled', updated_at=timezone.now())
+            tags = [model_tag(Order)] + [model_tag(Order, pk) for pk in order_ids]
+            invalidate_tags(*tags)
+            transaction.on_commit(lambda: invalidate_tags(*tags))
+        yield len(order_ids), units
@@ -1,3 +1,127 @@
+from datetime import timedelta
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
+from decimal import Decimal
+from accounts.models import User
+from catalog.models import Category, Product, ProductVariant
+from orders.models import Order
+from .models import StockMovement, StockReservation
+from .stock import InsufficientStock, decrement_stock, release_expired_reservations, reserve_stock
 
-# Create your tests here.
+
+class DecrementStockTest(TestCase):
+    """Test atomic stock decrements."""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        self.variant = ProductVariant.objects.create(
+            product=product, sku='TEST-001', price=Decimal('10.00'), stock_quantity=5
+        )
+        self.other = ProductVariant.objects.create(
+            product=product, sku='TEST-002', price=Decimal('2.50'), stock_quantity=2
+        )
+        self.untracked = ProductVariant.objects.create(
+            product=product, sku='TEST-003', price=Decimal('1.00'), stock_quantity=0, track_inventory=False
+        )
+    
+    def stock(self, variant):
+        return ProductVariant.objects.values_list('stock_quantity', flat=True).get(pk=variant.pk)
+    
+    def test_decrements_and_records_movements(self):
+        with transaction.atomic():
+            decrement_stock(
+                [(self.variant, 2), (self.untracked, 4), (self.variant, 1)], reference='ORD-1'
+            )
+        self.assertEqual(self.stock(self.variant), 2)
+        self.assertEqual(self.stock(self.untracked), 0)
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list('variant_id', 'movement_type', 'quantity', 'reference')),
+            [(self.variant.id, 'sale', -3, 'ORD-1'), (self.untracked.id, 'sale', -4, 'ORD-1')],
+        )
+    
+    def test_reports_every_shortfall_and_rolls_back(self):
+        self.other.is_active = False
+        self.other.save()
+        with self.assertRaises(InsufficientStock) as raised:
+            with transaction.atomic():
+                decrement_stock([(self.variant, 6), (self.other, 1), (self.untracked, 1)])
+        self.assertEqual(raised.exception.shortfalls, [
+            {'variant_id': self.variant.id, 'name': self.variant.display_name, 'requested': 6, 'available': 5},
+            {'variant_id': self.other.id, 'name': self.other.display_name, 'requested': 1, 'available': 0},
+        ])
+        self.assertEqual(self.stock(self.variant), 5)
+        self.assertFalse(StockMovement.objects.exists())
+    
+    def test_exact_stock_can_be_taken(self):
+        with transaction.atomic():
+            decrement_stock([(self.other, 2)])
+        self.assertEqual(self.stock(self.other), 0)
+        with self.assertRaises(InsufficientStock):
+            with transaction.atomic():
+                decrement_stock([(self.other, 1)])
+
+
+class StockReservationTest(TestCase):
+    """Test stock holds for unpaid orders and their expiry."""
+    
+    def setUp(self):
+        user = User.objects.create_user(username='buyer', email='buyer@example.com', password='testpass123')
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        self.variant = ProductVariant.objects.create(
+            product=product, sku='TEST-001', price=Decimal('10.00'), stock_quantity=5
+        )
+        self.orders = [
+            Order.objects.create(
+                user=user, email=user.email, status='awaiting_payment',
+                subtotal=Decimal('20.00'), tax_amount=Decimal('2.00'), shipping_amount=Decimal('0.00'),
+                total=Decimal('22.00'),
+            )
+            for i in range(2)
+        ]
+        with transaction.atomic():
+            for order in self.orders:
+                reserve_stock(order, [(self.variant, 2)])
+    
+    def stock(self):
+        return ProductVariant.objects.values_list('stock_quantity', flat=True).get(pk=self.variant.pk)
+    
+    def expire(self, order):
+        StockReservation.objects.filter(order=order).update(expires_at=timezone.now() - timedelta(minutes=1))
+    
+    def test_reserve_takes_stock(self):
+        self.assertEqual(self.stock(), 1)
+        self.assertEqual(StockReservation.objects.filter(status='active').count(), 2)
+    
+    def test_sweeper_releases_expired_holds_and_cancels_order(self):
+        self.expire(self.orders[0])
+        self.assertEqual(list(release_expired_reservations(batch_size=10)), [(1, 2)])
+        self.assertEqual(self.stock(), 3)
+        self.orders[0].refresh_from_db()
+        self.assertEqual(self.orders[0].status, 'cancelled')
+        self.assertEqual(Order.objects.get(pk=self.orders[1].pk).status, 'awaiting_payment')
+        self.assertEqual(StockMovement.objects.get(movement_type='release').quantity, 2)
+        self.assertEqual(list(release_expired_reservations()), [])
+    
+    def test_paid_orders_keep_their_stock(self):
+        order = self.orders[0]
+        order.status = 'paid'
+        order.save()
+        self.expire(order)
+        self.assertEqual(list(release_expired_reservations()), [])
+        self.assertEqual(StockReservation.objects.get(order=order).status, 'committed')
+        self.assertEqual(self.stock(), 1)
+    
+    def test_cancelling_releases_once(self):
+        order = self.orders[0]
+        order.status = 'cancelled'
+        order.save()
+        order.save()
+        self.assertEqual(self.stock(), 3)
+        self.assertEqual(StockReservation.objects.get(order=order).status, 'released')
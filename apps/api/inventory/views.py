@@ -9,12 +9,13 @@ from django.http import StreamingHttpResponse
 from datetime import datetime, timedelta
 import json
 import time
-from .models import StockAdjustment, LowStockAlert, InventoryReport, StockMovement
+from .models import StockAdjustment, LowStockAlert, InventoryReport, StockMovement, StockReservation
 from .serializers import (
     StockAdjustmentSerializer, LowStockAlertSerializer, InventoryReportSerializer,
     StockMovementSerializer, StockLevelSerializer, InventoryValuationSerializer
 )
 from catalog.models import ProductVariant
+from api.pagination import KeysetPagination
 
 
 class StockAdjustmentListView(generics.ListCreateAPIView):
@@ -74,10 +75,11 @@ class InventoryReportListView(generics.ListAPIView):
 
 
 class StockMovementListView(generics.ListAPIView):
-    """List stock movements."""
+    """List stock movements, newest first, with keyset pagination."""
     
     serializer_class = StockMovementSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         queryset = StockMovement.objects.select_related('variant').order_by('-created_at')
@@ -100,6 +102,11 @@ class StockMovementListView(generics.ListAPIView):
 def stock_levels(request):
     """Get current stock levels for all variants."""
     variants = ProductVariant.objects.filter(track_inventory=True).select_related('product')
+    # stock_quantity is available-to-sell; held units are still on hand
+    reserved = dict(
+        StockReservation.objects.filter(status='active').order_by()
+        .values_list('variant').annotate(total=Sum('quantity'))
+    )
     
     stock_levels = []
     for variant in variants:
@@ -126,6 +133,8 @@ def stock_levels(request):
             'sku': variant.sku,
             'product_name': variant.product.name,
             'current_stock': variant.stock_quantity,
+            'reserved': reserved.get(variant.id, 0),
+            'on_hand': variant.stock_quantity + reserved.get(variant.id, 0),
             'threshold': low_stock_alert.threshold if low_stock_alert else 10,
             'status': status,
             'last_movement': last_movement.created_at if last_movement else None,
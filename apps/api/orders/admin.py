@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem, OrderDraft
+from .models import Order, OrderItem, OrderDraft, CheckoutIdempotencyKey
 
 
 class OrderItemInline(admin.TabularInline):
@@ -67,4 +67,11 @@ class OrderDraftAdmin(admin.ModelAdmin):
     def is_complete(self, obj):
         return obj.is_complete()
     is_complete.boolean = True
-    is_complete.short_description = 'Complete'
\ No newline at end of file
+    is_complete.short_description = 'Complete'
+
+
+@admin.register(CheckoutIdempotencyKey)
+class CheckoutIdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['key', 'user', 'order', 'response_status', 'created_at']
+    search_fields = ['key', 'user__email', 'order__order_number']
+    readonly_fields = ['user', 'key', 'draft_id', 'order', 'response_status', 'response_body', 'created_at']
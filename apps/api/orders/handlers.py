@@ -0,0 +1,13 @@
+"""Outbox handlers for order side effects (see outbox.dispatch)."""
+
+from accounts.points import record_order_points
+from outbox.dispatch import handles
+from .models import Order
+
+
+@handles('order.paid')
+def award_order_points(payload):
+    """Record the loyalty points award of a paid order; balances are updated by apply_points."""
+    order = Order.objects.filter(pk=payload['order_id']).first()
+    if order is not None:
+        record_order_points(order)
@@ -0,0 +1,35 @@
+"""
+Checkout key cleanup.
+
+``CheckoutIdempotencyKey`` rows are only replayed for
+``settings.CHECKOUT_IDEMPOTENCY_TTL``; after that they are dead weight on the
+``(user, key)`` index. They are deleted in bounded batches, oldest first, so
+the purge can run next to live checkouts.
+"""
+
+from datetime import timedelta
+from django.utils import timezone
+from .models import CheckoutIdempotencyKey
+
+
+def purge_checkout_keys(max_age=None, batch_size=1000):
+    """
+    Delete checkout keys older than ``max_age`` (a timedelta or seconds).
+    
+    Defaults to the replay window. Yields the number of keys deleted per
+    batch until none are left.
+    """
+    if max_age is None:
+        cutoff = CheckoutIdempotencyKey.expiry_cutoff()
+    else:
+        if not isinstance(max_age, timedelta):
+            max_age = timedelta(seconds=max_age)
+        cutoff = timezone.now() - max_age
+    
+    stale = CheckoutIdempotencyKey.objects.filter(created_at__lt=cutoff).order_by('created_at')
+    while True:
+        ids = list(stale.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        deleted, _ = CheckoutIdempotencyKey.objects.filter(pk__in=ids).delete()
+        yield deleted
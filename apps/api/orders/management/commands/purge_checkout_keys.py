@@ -0,0 +1,43 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from orders.maintenance import purge_checkout_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete checkout Idempotency-Keys that are past their replay window'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=float,
+            default=settings.CHECKOUT_IDEMPOTENCY_TTL / 3600,
+            help='Delete keys older than this many hours (default: settings.CHECKOUT_IDEMPOTENCY_TTL)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of keys to delete per statement (default: 1000)'
+        )
+        parser.add_argument(
+            '--continuous',
+            action='store_true',
+            help='Keep running, sleeping between passes',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=3600,
+            help='Seconds to sleep between passes in continuous mode (default: 3600)'
+        )
+    
+    def handle(self, *args, **options):
+        while True:
+            total = sum(purge_checkout_keys(
+                max_age=options['hours'] * 3600, batch_size=options['batch_size']
+            ))
+            self.stdout.write(self.style.SUCCESS(f'Purged {total} expired checkout keys'))
+            if not options['continuous']:
+                return
+            time.sleep(options['sleep'])
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+# One nextval() reserves a block of 20 numbers; keep in sync with
+# api.numbers.ORDER_NUMBERS.
+CREATE_SEQUENCE_SQL = """
+CREATE SEQUENCE IF NOT EXISTS orders_order_number_seq INCREMENT BY 20 START WITH 1;
+"""
+
+DROP_SEQUENCE_SQL = """
+DROP SEQUENCE IF EXISTS orders_order_number_seq;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_checkout_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SEQUENCE_SQL, DROP_SEQUENCE_SQL),
+    ]
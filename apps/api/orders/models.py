@@ -1,9 +1,38 @@
+from datetime import timedelta
+from django.conf import settings
 from django.db import models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, JSONObject
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 from accounts.models import User
-from catalog.models import ProductVariant
+from catalog.models import ProductImage, ProductVariant
 from cart.models import Cart
+from api.numbers import ORDER_NUMBERS
+
+
+class OrderQuerySet(models.QuerySet):
+    """QuerySet with listing helpers for Order."""
+    
+    def with_summary_data(self):
+        """
+        Annotate item count and the first item's primary image so a page of
+        order summaries is rendered without per-row queries.
+        """
+        quantities = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+            value=Sum('quantity')
+        ).values('value')
+        first_image = ProductImage.objects.filter(
+            product__variants__orderitem__order=OuterRef('pk'), is_primary=True
+        ).order_by('product__variants__orderitem__id').values(
+            data=JSONObject(image='image', alt_text='alt_text')
+        )[:1]
+        
+        return self.annotate(
+            item_count=Coalesce(Subquery(quantities), 0),
+            thumbnail_data=Subquery(first_image),
+        )
 
 
 class Order(models.Model):
@@ -68,6 +97,8 @@ class Order(models.Model):
     shipped_at = models.DateTimeField(null=True, blank=True)
     delivered_at = models.DateTimeField(null=True, blank=True)
     
+    objects = OrderQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -75,20 +106,29 @@ class Order(models.Model):
             models.Index(fields=['user']),
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['user', 'created_at', 'id'], name='orders_order_user_created_id'),
         ]
     
     def __str__(self):
         return f"Order {self.order_number}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as last loaded or saved, so post_save handlers can tell transitions.
+        instance.saved_status = instance.__dict__.get('status')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.order_number:
             self.order_number = self.generate_order_number()
         super().save(*args, **kwargs)
+        self.saved_status = self.status
     
     def generate_order_number(self):
         """Generate unique order number."""
-        import uuid
-        return f"ORD-{uuid.uuid4().hex[:8].upper()}"
+        # Ten digits never clash with the older ORD-<8 hex> numbers.
+        return f"ORD-{ORDER_NUMBERS.next():010d}"
     
     @property
     def billing_full_name(self):
@@ -190,8 +230,9 @@ class OrderDraft(models.Model):
     
     def calculate_totals(self):
         """Calculate order totals based on cart items."""
-        self.subtotal = self.cart.subtotal
-        self.tax_amount = self.cart.tax_amount
+        totals = self.cart.get_totals()
+        self.subtotal = totals.subtotal
+        self.tax_amount = totals.tax_amount
         self.shipping_amount = Decimal('10.00')  # Fixed shipping for now
         self.total = self.subtotal + self.tax_amount + self.shipping_amount
         self.save()
@@ -206,4 +247,43 @@ class OrderDraft(models.Model):
             'shipping_address_1', 'shipping_city', 'shipping_state',
             'shipping_postal_code', 'shipping_country'
         ]
-        return all(getattr(self, field) for field in required_fields)
\ No newline at end of file
+        return all(getattr(self, field) for field in required_fields)
+
+
+class CheckoutIdempotencyKey(models.Model):
+    """
+    Result of a checkout request, keyed by the client's ``Idempotency-Key``.
+    
+    The row is inserted in the same transaction as the order it produces, so
+    a retry either blocks on the unique index until the first attempt commits
+    and then replays its response, or takes over the key if that attempt
+    rolled back. Only successful checkouts are stored, and only for
+    ``settings.CHECKOUT_IDEMPOTENCY_TTL``; ``purge_checkout_keys`` deletes
+    them after that.
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='checkout_keys')
+    key = models.CharField(max_length=255)
+    draft_id = models.PositiveIntegerField(help_text="Draft the key was first used with")
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['user', 'key']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Checkout key {self.key} for {self.user.email}"
+    
+    @staticmethod
+    def expiry_cutoff():
+        """Keys created before this are no longer replayed."""
+        return timezone.now() - timedelta(seconds=settings.CHECKOUT_IDEMPOTENCY_TTL)
+    
+    @property
+    def is_expired(self):
+        return self.created_at < self.expiry_cutoff()
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from decimal import Decimal
 from .models import Order, OrderItem, OrderDraft
-from catalog.serializers import ProductVariantSerializer
+from catalog.serializers import ProductVariantSerializer, annotated_image_data
+from inventory.stock import reserve_stock
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -46,6 +47,24 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
 
 
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """Compact order for history lists; needs ``Order.objects.with_summary_data()``."""
+    
+    item_count = serializers.IntegerField(read_only=True)
+    thumbnail = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_number', 'status', 'payment_status', 'total',
+            'item_count', 'thumbnail', 'created_at'
+        ]
+        read_only_fields = fields
+    
+    def get_thumbnail(self, obj):
+        return annotated_image_data(obj.thumbnail_data, self.context.get('request'))
+
+
 class OrderDraftSerializer(serializers.ModelSerializer):
     """Serializer for OrderDraft model."""
     
@@ -122,7 +141,7 @@ class OrderCreateSerializer(serializers.Serializer):
         """Create order from draft."""
         from django.db import transaction
         
-        draft = OrderDraft.objects.get(id=validated_data['draft_id'])
+        draft = OrderDraft.objects.select_related('cart', 'user').get(id=validated_data['draft_id'])
         
         with transaction.atomic():
             # Create order
@@ -156,17 +175,23 @@ class OrderCreateSerializer(serializers.Serializer):
                 status='awaiting_payment'
             )
             
-            # Create order items from cart
-            for cart_item in draft.cart.items.all():
-                OrderItem.objects.create(
+            # Read cart lines once; hold stock atomically, then insert items in one statement
+            cart_items = list(draft.cart.items.select_related('variant__product'))
+            reserve_stock(order, [(cart_item.variant, cart_item.quantity) for cart_item in cart_items])
+            OrderItem.objects.bulk_create([
+                OrderItem(
                     order=order,
                     variant=cart_item.variant,
                     quantity=cart_item.quantity,
-                    price=cart_item.variant.price
+                    price=cart_item.variant.price,
+                    # bulk_create skips save(), which computes line_total
+                    line_total=cart_item.variant.price * cart_item.quantity
                 )
+                for cart_item in cart_items
+            ])
             
-            # Clear cart
-            draft.cart.items.all().delete()
+            # Clear cart (items and summary columns)
+            draft.cart.clear()
             
             # Delete draft
             draft.delete()
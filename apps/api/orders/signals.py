@@ -1,16 +1,27 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from .models import Order
+from api.performance import invalidate_on_change
+from inventory.stock import commit_reservations, release_reservations
+from outbox.dispatch import enqueue
+from .models import Order, OrderItem
+
+invalidate_on_change(Order)
+invalidate_on_change(OrderItem, related=['order'], own_tags=False)
+
+
+@receiver(post_save, sender=Order)
+def enqueue_paid_order(sender, instance, created, **kwargs):
+    """Queue the side effects of an order becoming paid in the transaction that saved it."""
+    if not created and instance.status == 'paid' and getattr(instance, 'saved_status', None) != 'paid':
+        enqueue('order.paid', {'order_id': instance.pk}, key=f'order.paid:{instance.pk}')
 
 
 @receiver(post_save, sender=Order)
-def award_points_on_payment(sender, instance, created, **kwargs):
-    """Award points when order status changes to paid."""
-    if not created and instance.status == 'paid':
-        # Award 1 point per dollar spent (rounded down)
-        points_to_award = int(instance.total)
-        if points_to_award > 0:
-            instance.user.add_points(
-                points_to_award, 
-                f"Order {instance.order_number} payment"
-            )
+def settle_stock_reservations(sender, instance, created, **kwargs):
+    """Commit held stock when an order is paid; release it when cancelled."""
+    if created:
+        return
+    if instance.status == 'paid':
+        commit_reservations([instance.pk])
+    elif instance.status == 'cancelled':
+        release_reservations([instance.pk])
@@ -1,3 +1,218 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from decimal import Decimal
+from accounts.models import User
+from api.numbers import BlockSequence
+from cart.models import Cart, CartItem
+from catalog.models import Category, Product, ProductImage, ProductVariant
+from inventory.models import StockMovement
+from inventory.stock import InsufficientStock
+from .maintenance import purge_checkout_keys
+from .models import Order, OrderDraft, CheckoutIdempotencyKey
+from .serializers import OrderCreateSerializer
 
-# Create your tests here.
+
+class OrderNumberTest(TestCase):
+    """Test block-allocated order numbers."""
+    
+    def test_numbers_are_sequential_within_a_block(self):
+        numbers = BlockSequence('orders_order_number_seq', 20)
+        with self.assertNumQueries(1):
+            values = [numbers.next() for i in range(20)]
+        self.assertEqual(values, list(range(values[0], values[0] + 20)))
+        with self.assertNumQueries(1):
+            self.assertGreater(numbers.next(), values[-1])
+    
+    def test_order_number_format(self):
+        first, second = Order().generate_order_number(), Order().generate_order_number()
+        self.assertRegex(first, r'^ORD-\d{10}$')
+        self.assertGreater(second, first)
+
+
+class CheckoutTestCase(APITestCase):
+    """A user with a three-line cart and a complete draft."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='testpass123'
+        )
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        self.variants = [
+            ProductVariant.objects.create(
+                product=product, sku=f'TEST-{i:03}', price=Decimal('10.00') + i, stock_quantity=10
+            )
+            for i in range(3)
+        ]
+        self.cart = Cart.objects.create(user=self.user)
+        for i, variant in enumerate(self.variants):
+            CartItem.objects.create(cart=self.cart, variant=variant, quantity=i + 1)
+        
+        address = {
+            'first_name': 'Test', 'last_name': 'User', 'address_1': '1 Main St', 'city': 'Town',
+            'state': 'ST', 'postal_code': '12345', 'country': 'US',
+        }
+        self.draft = OrderDraft.objects.create(
+            user=self.user, cart=self.cart, email=self.user.email,
+            **{f'billing_{key}': value for key, value in address.items()},
+            **{f'shipping_{key}': value for key, value in address.items()},
+        )
+        self.draft.calculate_totals()
+        self.request = RequestFactory().post('/')
+        self.request.user = self.user
+
+
+class OrderCreateTest(CheckoutTestCase):
+    """Test creating an order from a checkout draft."""
+    
+    def test_create_order_from_draft(self):
+        serializer = OrderCreateSerializer(data={'draft_id': self.draft.id}, context={'request': self.request})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        order = serializer.save()
+        
+        items = list(order.items.values_list('variant_id', 'quantity', 'price', 'line_total'))
+        self.assertEqual(items, [
+            (self.variants[0].id, 1, Decimal('10.00'), Decimal('10.00')),
+            (self.variants[1].id, 2, Decimal('11.00'), Decimal('22.00')),
+            (self.variants[2].id, 3, Decimal('12.00'), Decimal('36.00')),
+        ])
+        self.assertEqual(order.status, 'awaiting_payment')
+        self.assertFalse(self.cart.items.exists())
+        self.assertEqual(Cart.objects.get(pk=self.cart.pk).item_count, 0)
+        self.assertFalse(OrderDraft.objects.filter(pk=self.draft.pk).exists())
+        stock = ProductVariant.objects.order_by('pk').values_list('stock_quantity', flat=True)
+        self.assertEqual(list(stock), [9, 8, 7])
+        self.assertEqual(StockMovement.objects.filter(reference=order.order_number).count(), 3)
+    
+    def test_out_of_stock_rolls_back_order(self):
+        ProductVariant.objects.filter(pk=self.variants[2].pk).update(stock_quantity=2)
+        serializer = OrderCreateSerializer(data={'draft_id': self.draft.id}, context={'request': self.request})
+        serializer.is_valid()
+        with self.assertRaises(InsufficientStock) as raised:
+            serializer.save()
+        self.assertEqual(raised.exception.shortfalls[0]['available'], 2)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(ProductVariant.objects.get(pk=self.variants[0].pk).stock_quantity, 10)
+        self.assertEqual(self.cart.items.count(), 3)
+    
+    def test_only_stock_updates_grow_with_cart_size(self):
+        serializer = OrderCreateSerializer(data={'draft_id': self.draft.id}, context={'request': self.request})
+        serializer.is_valid()
+        # One conditional stock UPDATE per variant; everything else is fixed.
+        with self.assertNumQueries(12 + len(self.variants)):
+            serializer.save()
+        self.assertEqual(Order.objects.get().items.count(), 3)
+
+
+class CheckoutIdempotencyTest(CheckoutTestCase):
+    """Test Idempotency-Key handling on finalize."""
+    
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+    
+    def finalize(self, key, draft_id=None):
+        return self.client.post(
+            reverse('order-finalize'), {'draft_id': draft_id or self.draft.id},
+            format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+    
+    def test_retry_replays_stored_response(self):
+        first = self.finalize('checkout-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        
+        with self.assertNumQueries(1):
+            retry = self.finalize('checkout-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(ProductVariant.objects.get(pk=self.variants[0].pk).stock_quantity, 9)
+    
+    def test_key_reused_with_other_draft_is_rejected(self):
+        self.finalize('checkout-1')
+        response = self.finalize('checkout-1', draft_id=self.draft.id + 1)
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+    
+    def test_failed_attempt_does_not_consume_key(self):
+        ProductVariant.objects.filter(pk=self.variants[2].pk).update(stock_quantity=0)
+        self.assertEqual(self.finalize('checkout-1').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CheckoutIdempotencyKey.objects.exists())
+        
+        ProductVariant.objects.filter(pk=self.variants[2].pk).update(stock_quantity=10)
+        self.assertEqual(self.finalize('checkout-1').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(CheckoutIdempotencyKey.objects.get().order, Order.objects.get())
+
+    
+    def expire_keys(self):
+        CheckoutIdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+    
+    def test_expired_key_is_not_replayed(self):
+        self.assertEqual(self.finalize('checkout-1').status_code, status.HTTP_201_CREATED)
+        self.expire_keys()
+        for variant in self.variants:
+            CartItem.objects.create(cart=self.cart, variant=variant, quantity=1)
+        self.draft.pk = None
+        self.draft.save()
+        
+        response = self.finalize('checkout-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(CheckoutIdempotencyKey.objects.get().order_id, response.data['order_id'])
+    
+    def test_purge_deletes_expired_keys(self):
+        self.finalize('checkout-1')
+        self.assertEqual(list(purge_checkout_keys()), [])
+        self.expire_keys()
+        
+        out = StringIO()
+        call_command('purge_checkout_keys', '--batch-size', '1', stdout=out)
+        self.assertIn('Purged 1 expired checkout keys', out.getvalue())
+        self.assertFalse(CheckoutIdempotencyKey.objects.exists())
+        self.assertTrue(Order.objects.exists())
+
+
+class OrderHistoryTest(CheckoutTestCase):
+    """Test the order list and detail endpoints."""
+    
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+        ProductImage.objects.create(
+            product=self.variants[0].product, image='products/test.jpg', alt_text='Test', is_primary=True
+        )
+        for i in range(3):
+            serializer = OrderCreateSerializer(data={'draft_id': self.draft.id}, context={'request': self.request})
+            serializer.is_valid()
+            serializer.save()
+            for variant in self.variants:
+                CartItem.objects.create(cart=self.cart, variant=variant, quantity=1)
+            self.draft.pk = None
+            self.draft.save()
+    
+    def test_list_returns_summaries_in_one_query_per_page(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('order-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(len(results), 3)
+        self.assertNotIn('items', results[0])
+        self.assertEqual([order['item_count'] for order in results], [3, 3, 6])
+        self.assertTrue(results[0]['thumbnail']['image'].endswith('products/test.jpg'))
+        self.assertEqual(results[0]['thumbnail']['alt_text'], 'Test')
+    
+    def test_detail_query_count_is_independent_of_item_count(self):
+        order = Order.objects.order_by('pk').first()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('order-detail', args=[order.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['items']), 3)
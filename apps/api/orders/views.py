@@ -3,12 +3,18 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db import transaction
-from .models import Order, OrderDraft
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.utils.decorators import method_decorator
+from .models import Order, OrderItem, OrderDraft, CheckoutIdempotencyKey
 from .serializers import (
-    OrderSerializer, OrderDraftSerializer, OrderDraftCreateSerializer, OrderCreateSerializer
+    OrderSerializer, OrderSummarySerializer, OrderDraftSerializer, OrderDraftCreateSerializer,
+    OrderCreateSerializer
 )
-from cart.models import Cart
+from cart.views import get_or_create_cart
+from inventory.stock import InsufficientStock
+from api.pagination import KeysetPagination
+from api.performance import cache_response
 
 
 class OrderDraftView(generics.RetrieveUpdateAPIView):
@@ -49,15 +55,20 @@ class OrderCreateView(generics.CreateAPIView):
 
 
 class OrderListView(generics.ListAPIView):
-    """List user's orders."""
+    """List user's orders, newest first, with keyset pagination."""
     
-    serializer_class = OrderSerializer
+    serializer_class = OrderSummarySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.filter(user=self.request.user).with_summary_data()
 
 
+@method_decorator(
+    cache_response('order_detail', tags=lambda request, pk: [f'order:{pk}']),
+    name='get',
+)
 class OrderDetailView(generics.RetrieveAPIView):
     """Get order details."""
     
@@ -65,7 +76,10 @@ class OrderDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        # Order, then items with their variants and products: two queries.
+        return Order.objects.filter(user=self.request.user).prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('variant__product'))
+        )
 
 
 @api_view(['POST'])
@@ -141,12 +155,72 @@ def update_order_draft(request, draft_id):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def finalize_order(request):
-    """Finalize order from draft."""
+    """
+    Finalize order from draft.
+    
+    Send an ``Idempotency-Key`` header to make retries safe: a repeated key
+    returns the stored response of the first successful attempt without
+    touching the cart or stock again.
+    """
     draft_id = request.data.get('draft_id')
     
     if not draft_id:
         return Response({'error': 'draft_id is required'}, status=status.HTTP_400_BAD_REQUEST)
-    
+    try:
+        draft_id = int(draft_id)
+    except (TypeError, ValueError):
+        return Response({'error': 'draft_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key is None:
+        return create_order_from_draft(request, draft_id)
+    if not 0 < len(idempotency_key) <= 255:
+        return Response({'error': 'Invalid Idempotency-Key'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    record = CheckoutIdempotencyKey.objects.filter(user=request.user, key=idempotency_key).first()
+    if record is not None and not record.is_expired:
+        return replay_checkout(record, draft_id)
+    
+    with transaction.atomic():
+        if record is not None:
+            # An expired key is free for reuse; its old result is dropped.
+            CheckoutIdempotencyKey.objects.filter(pk=record.pk).delete()
+        try:
+            with transaction.atomic():
+                record = CheckoutIdempotencyKey.objects.create(
+                    user=request.user, key=idempotency_key, draft_id=draft_id
+                )
+        except IntegrityError:
+            # A concurrent attempt with this key committed while we waited.
+            record = CheckoutIdempotencyKey.objects.get(user=request.user, key=idempotency_key)
+            return replay_checkout(record, draft_id)
+        
+        response = create_order_from_draft(request, draft_id)
+        if response.status_code == status.HTTP_201_CREATED:
+            record.order_id = response.data['order_id']
+            record.response_status = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=['order', 'response_status', 'response_body'])
+        else:
+            # Failed attempts do not consume the key; the client may retry.
+            transaction.set_rollback(True)
+    return response
+
+
+def replay_checkout(record, draft_id):
+    """Return the stored response for a repeated Idempotency-Key."""
+    if record.draft_id != draft_id:
+        return Response(
+            {'error': 'Idempotency-Key was already used with a different draft'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def create_order_from_draft(request, draft_id):
+    """Validate the draft and create its order."""
     try:
         draft = OrderDraft.objects.get(id=draft_id, user=request.user)
     except OrderDraft.DoesNotExist:
@@ -155,27 +229,16 @@ def finalize_order(request):
     if not draft.is_complete():
         return Response({'error': 'Order draft is incomplete'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Check stock availability
-    out_of_stock_items = []
-    for cart_item in draft.cart.items.all():
-        if cart_item.variant.track_inventory and cart_item.quantity > cart_item.variant.stock_quantity:
-            out_of_stock_items.append({
-                'variant_id': cart_item.variant.id,
-                'name': cart_item.variant.display_name,
-                'requested': cart_item.quantity,
-                'available': cart_item.variant.stock_quantity
-            })
-    
-    if out_of_stock_items:
-        return Response({
-            'error': 'Some items are out of stock',
-            'out_of_stock_items': out_of_stock_items
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Create order
+    # Create order; stock is taken atomically inside the order transaction
     serializer = OrderCreateSerializer(data={'draft_id': draft_id}, context={'request': request})
     if serializer.is_valid():
-        order = serializer.save()
+        try:
+            order = serializer.save()
+        except InsufficientStock as e:
+            return Response({
+                'error': 'Some items are out of stock',
+                'out_of_stock_items': e.shortfalls
+            }, status=status.HTTP_400_BAD_REQUEST)
         return Response({
             'order_id': order.id,
             'order_number': order.order_number,
@@ -183,17 +246,4 @@ def finalize_order(request):
             'total': float(order.total)
         }, status=status.HTTP_201_CREATED)
     
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-def get_or_create_cart(request):
-    """Get or create cart for user or session."""
-    if request.user.is_authenticated:
-        cart, created = Cart.objects.get_or_create(user=request.user)
-    else:
-        session_key = request.session.session_key
-        if not session_key:
-            request.session.create()
-            session_key = request.session.session_key
-        cart, created = Cart.objects.get_or_create(session_key=session_key)
-    return cart
\ No newline at end of file
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Transactional outbox.
+
+Non-critical side effects of order and payment changes (points awards and the
+like) are not run in the request. Instead ``enqueue`` inserts an
+``OutboxMessage`` on the same connection, so it commits or rolls back with the
+change that caused it: a message exists exactly when its change was committed,
+and nothing is lost if the process dies before the work is done.
+
+The ``run_outbox_worker`` command drains the table. Each batch is claimed with
+``FOR UPDATE SKIP LOCKED``, so any number of workers (threads or processes)
+share the queue without blocking each other. A handler runs in a savepoint
+inside the batch transaction and its message is deleted in that same
+transaction, so database side effects are applied exactly once. Work outside
+the database (emails, HTTP calls) may repeat after a crash and should be
+idempotent. Failed messages are retried with exponential backoff and marked
+``failed`` after ``settings.OUTBOX_MAX_ATTEMPTS``.
+
+Handlers are registered per topic with ``@handles('topic')`` in a module the
+owning app imports from ``AppConfig.ready``.
+"""
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def handles(topic):
+    """Register the decorated function as the handler for ``topic`` messages."""
+    def register(func):
+        _handlers[topic] = func
+        return func
+    return register
+
+
+def enqueue(topic, payload=None, key=None, delay=None):
+    """
+    Queue a message in the current transaction.
+    
+    With ``key``, the message is dropped if one with the same key is already
+    outstanding.
+    """
+    message = OutboxMessage(
+        topic=topic,
+        payload=payload or {},
+        key=key,
+        available_at=timezone.now() + timedelta(seconds=delay or 0),
+    )
+    OutboxMessage.objects.bulk_create([message], ignore_conflicts=key is not None)
+    return message
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(2 ** attempts, 3600))
+
+
+def process_batch(batch_size=20):
+    """
+    Deliver up to ``batch_size`` due messages.
+    
+    Returns ``(delivered, failed)``; ``(0, 0)`` means nothing was claimable.
+    """
+    now = timezone.now()
+    delivered = []
+    failed = []
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        for message in messages:
+            try:
+                handler = _handlers[message.topic]
+                with transaction.atomic():
+                    handler(message.payload)
+            except Exception as e:
+                logger.warning(f"Outbox message {message.pk} ({message.topic}) failed: {e!r}")
+                message.attempts += 1
+                message.last_error = repr(e)
+                if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    message.status = 'failed'
+                else:
+                    message.available_at = now + _retry_delay(message.attempts)
+                failed.append(message)
+            else:
+                delivered.append(message.pk)
+        
+        OutboxMessage.objects.filter(pk__in=delivered).delete()
+        OutboxMessage.objects.bulk_update(failed, ['attempts', 'last_error', 'status', 'available_at'])
+    return len(delivered), len(failed)
+
+
+def drain(batch_size=20):
+    """Process batches until no due message is left; yields ``(delivered, failed)`` per batch."""
+    while True:
+        delivered, failed = process_batch(batch_size)
+        if not delivered and not failed:
+            return
+        yield delivered, failed
@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
+from django.core.management.base import BaseCommand
+from outbox.dispatch import drain
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox messages (order and payment side effects)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of worker threads, each with its own database connection (default: 4)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Number of messages each worker claims per transaction (default: 20)'
+        )
+        parser.add_argument(
+            '--continuous',
+            action='store_true',
+            help='Keep running, sleeping between passes',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1,
+            help='Seconds to sleep between passes in continuous mode (default: 1)'
+        )
+    
+    def handle(self, *args, **options):
+        concurrency = max(options['concurrency'], 1)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                started = time.monotonic()
+                results = list(pool.map(self.drain, [options['batch_size']] * concurrency))
+                delivered = sum(result[0] for result in results)
+                failed = sum(result[1] for result in results)
+                
+                if delivered or failed or not options['continuous']:
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f'Delivered {delivered} outbox messages ({failed} failed attempts) '
+                            f'in {time.monotonic() - started:.1f}s'
+                        )
+                    )
+                if not options['continuous']:
+                    return
+                time.sleep(options['sleep'])
+    
+    def drain(self, batch_size):
+        delivered = failed = 0
+        try:
+            for batch_delivered, batch_failed in drain(batch_size):
+                delivered += batch_delivered
+                failed += batch_failed
+        finally:
+            # Worker threads get their own connection; don't leave it open between passes.
+            connection.close()
+        return delivered, failed
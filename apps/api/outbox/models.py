@@ -0,0 +1,33 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """A side effect recorded in the transaction that caused it, run later by the outbox worker."""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('failed', 'Failed'),
+    ]
+    
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    key = models.CharField(
+        max_length=200, unique=True, null=True, blank=True,
+        help_text="Optional deduplication key; a message with the same key is not queued twice"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Not delivered before this time")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['available_at', 'id'], condition=Q(status='pending'), name='outbox_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.topic} #{self.pk} ({self.status})"
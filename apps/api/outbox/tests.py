@@ -0,0 +1,83 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from decimal import Decimal
+from accounts.models import PointsTransaction, User
+from orders.models import Order
+from .dispatch import drain, enqueue, handles, process_batch
+from .models import OutboxMessage
+
+calls = []
+
+
+@handles('test.record')
+def record(payload):
+    calls.append(payload['value'])
+
+
+@handles('test.fail')
+def fail(payload):
+    User.objects.update(points=999)
+    raise RuntimeError('boom')
+
+
+class OutboxTest(TestCase):
+    """Test queueing and delivering outbox messages."""
+    
+    def setUp(self):
+        calls.clear()
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='testpass123')
+    
+    def test_messages_are_delivered_in_order_and_removed(self):
+        for value in range(3):
+            enqueue('test.record', {'value': value})
+        self.assertEqual(list(drain(batch_size=2)), [(2, 0), (1, 0)])
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertFalse(OutboxMessage.objects.exists())
+    
+    def test_duplicate_key_is_queued_once(self):
+        enqueue('test.record', {'value': 1}, key='once')
+        enqueue('test.record', {'value': 1}, key='once')
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+    
+    def test_delayed_message_waits(self):
+        enqueue('test.record', {'value': 1}, delay=60)
+        self.assertEqual(process_batch(), (0, 0))
+        self.assertEqual(calls, [])
+    
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_failure_rolls_back_handler_and_retries_with_backoff(self):
+        enqueue('test.fail')
+        enqueue('test.record', {'value': 1})
+        self.assertEqual(process_batch(), (1, 1))
+        self.assertEqual(User.objects.get().points, 0)
+        
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertIn('boom', message.last_error)
+        self.assertGreater(message.available_at, timezone.now())
+        
+        OutboxMessage.objects.update(available_at=timezone.now())
+        self.assertEqual(process_batch(), (0, 1))
+        self.assertEqual(OutboxMessage.objects.get().status, 'failed')
+        self.assertEqual(process_batch(), (0, 0))
+    
+    def test_paid_order_queues_points_award(self):
+        order = Order.objects.create(
+            user=self.user, email=self.user.email, status='awaiting_payment',
+            subtotal=Decimal('20.00'), tax_amount=Decimal('0.00'), shipping_amount=Decimal('0.00'),
+            total=Decimal('20.00'),
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
+        order.status = 'paid'
+        order.save()
+        order.save()
+        
+        self.assertEqual(OutboxMessage.objects.get().topic, 'order.paid')
+        self.assertFalse(PointsTransaction.objects.exists())
+        self.assertEqual(list(drain()), [(1, 0)])
+        self.assertEqual(PointsTransaction.objects.get().amount, 20)
+        
+        # Later saves of the paid order, fresh or reloaded, queue nothing.
+        order.save()
+        Order.objects.get(pk=order.pk).save()
+        self.assertFalse(OutboxMessage.objects.exists())
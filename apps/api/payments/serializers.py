@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import PaymentIntent, Payment, WebhookEvent
+from .settlement import settle_payment
 
 
 class PaymentIntentSerializer(serializers.ModelSerializer):
@@ -98,7 +99,6 @@ class ConfirmPaymentSerializer(serializers.Serializer):
         """Confirm payment and create Payment record."""
         import stripe
         from django.conf import settings
-        from django.utils import timezone
         
         stripe.api_key = settings.STRIPE_SECRET_KEY
         
@@ -116,25 +116,19 @@ class ConfirmPaymentSerializer(serializers.Serializer):
         
         # Create Payment record if succeeded
         if payment_intent.status == 'succeeded':
-            payment = Payment.objects.create(
-                stripe_payment_intent_id=payment_intent.id,
+            payment, order, paid = settle_payment(
+                payment_intent_obj.order_id,
+                payment_intent.id,
                 stripe_charge_id=payment_intent.latest_charge,
-                order=payment_intent_obj.order,
                 amount=payment_intent_obj.amount,
                 currency=payment_intent_obj.currency,
-                status='succeeded',
                 payment_method=payment_intent.payment_method_types[0] if payment_intent.payment_method_types else 'card',
                 payment_method_details=payment_intent.charges.data[0].payment_method_details if payment_intent.charges.data else {},
-                paid_at=timezone.now(),
             )
-            
-            # Update order status
-            payment_intent_obj.order.status = 'paid'
-            payment_intent_obj.order.paid_at = timezone.now()
-            payment_intent_obj.order.payment_intent_id = payment_intent.id
-            payment_intent_obj.order.payment_method = payment.payment_method
-            payment_intent_obj.order.payment_status = 'succeeded'
-            payment_intent_obj.order.save()
+            if not paid:
+                raise serializers.ValidationError(
+                    'Order is no longer awaiting payment; the payment will be refunded.'
+                )
             
             return payment
         
@@ -0,0 +1,60 @@
+"""
+Settling succeeded payments.
+
+The API confirmation, the confirm serializer and the Stripe webhook all go
+through ``settle_payment``. It locks the order row before touching it, so a
+payment racing the expired-reservation sweeper (``inventory.stock``) or the
+other confirmation path is applied against the order's current status. An
+order that can no longer be paid (typically cancelled after its stock hold
+expired and the stock went back on sale) is not revived: the payment is
+recorded and the order is flagged ``payment_status='refund_required'``.
+"""
+
+import logging
+from django.db import transaction
+from django.utils import timezone
+from orders.models import Order
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+
+def settle_payment(order_id, payment_intent_id, **payment_fields):
+    """
+    Record a succeeded payment and mark its order paid.
+    
+    ``payment_fields`` are passed to the ``Payment`` record. Repeated calls
+    for the same payment intent are no-ops. Returns ``(payment, order, paid)``;
+    ``paid`` is False when the order could not be paid and needs a refund.
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(pk=order_id)
+        payment, created = Payment.objects.get_or_create(
+            stripe_payment_intent_id=payment_intent_id,
+            defaults={
+                'order': order,
+                'status': 'succeeded',
+                'paid_at': timezone.now(),
+                **payment_fields,
+            },
+        )
+        if not created:
+            # Already settled by the other confirmation path.
+            return payment, order, order.payment_status == 'succeeded'
+        
+        if not order.can_transition_to('paid'):
+            order.payment_status = 'refund_required'
+            order.save(update_fields=['payment_status', 'updated_at'])
+            logger.warning(
+                f"Payment {payment_intent_id} received for order {order.order_number} "
+                f"in status '{order.status}'; flagged for refund"
+            )
+            return payment, order, False
+        
+        order.status = 'paid'
+        order.paid_at = payment.paid_at
+        order.payment_intent_id = payment_intent_id
+        order.payment_method = payment.payment_method
+        order.payment_status = 'succeeded'
+        order.save()
+    return payment, order, True
@@ -1,3 +1,63 @@
+from datetime import timedelta
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
+from decimal import Decimal
+from accounts.models import User
+from catalog.models import Category, Product, ProductVariant
+from inventory.models import StockReservation
+from inventory.stock import release_expired_reservations, reserve_stock
+from orders.models import Order
+from .models import Payment, PaymentIntent
+from .views import handle_payment_intent_succeeded
 
-# Create your tests here.
+
+class PaymentSettlementTest(TestCase):
+    """Test settling succeeded payments against the order's current status."""
+    
+    def setUp(self):
+        user = User.objects.create_user(username='buyer', email='buyer@example.com', password='testpass123')
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        product = Product.objects.create(
+            name='Test Product', slug='test-product', description='A test product', category=category
+        )
+        self.variant = ProductVariant.objects.create(
+            product=product, sku='TEST-001', price=Decimal('10.00'), stock_quantity=5
+        )
+        self.order = Order.objects.create(
+            user=user, email=user.email, status='awaiting_payment',
+            subtotal=Decimal('20.00'), tax_amount=Decimal('0.00'), shipping_amount=Decimal('0.00'),
+            total=Decimal('20.00'),
+        )
+        with transaction.atomic():
+            reserve_stock(self.order, [(self.variant, 2)])
+        PaymentIntent.objects.create(
+            stripe_payment_intent_id='pi_test', stripe_client_secret='secret',
+            order=self.order, amount=self.order.total,
+        )
+    
+    def stock(self):
+        return ProductVariant.objects.values_list('stock_quantity', flat=True).get(pk=self.variant.pk)
+    
+    def test_payment_marks_order_paid_once(self):
+        handle_payment_intent_succeeded({'id': 'pi_test', 'latest_charge': 'ch_test'})
+        handle_payment_intent_succeeded({'id': 'pi_test', 'latest_charge': 'ch_test'})
+        
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.status, order.payment_status), ('paid', 'succeeded'))
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assertEqual(StockReservation.objects.get().status, 'committed')
+    
+    def test_payment_after_expiry_does_not_revive_order(self):
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(list(release_expired_reservations()), [(1, 2)])
+        self.assertEqual(self.stock(), 5)
+        
+        # The webhook arrives late, holding no lock and a stale view of the order.
+        handle_payment_intent_succeeded({'id': 'pi_test', 'latest_charge': 'ch_test'})
+        
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.status, order.payment_status), ('cancelled', 'refund_required'))
+        self.assertEqual(Payment.objects.get().order, order)
+        self.assertEqual(StockReservation.objects.get().status, 'released')
+        self.assertEqual(self.stock(), 5)
@@ -11,6 +11,7 @@ import stripe
 import json
 import logging
 from .models import PaymentIntent, Payment, WebhookEvent
+from .settlement import settle_payment
 from .serializers import (
     PaymentIntentSerializer, PaymentSerializer, 
     CreatePaymentIntentSerializer, ConfirmPaymentSerializer
@@ -143,26 +144,19 @@ def confirm_payment(request):
         payment_intent_obj.save()
         
         if payment_intent.status == 'succeeded':
-            # Create Payment record
-            payment = Payment.objects.create(
-                stripe_payment_intent_id=payment_intent.id,
+            payment, order, paid = settle_payment(
+                payment_intent_obj.order_id,
+                payment_intent.id,
                 stripe_charge_id=payment_intent.latest_charge,
-                order=payment_intent_obj.order,
                 amount=payment_intent_obj.amount,
                 currency=payment_intent_obj.currency,
-                status='succeeded',
                 payment_method='card',
-                paid_at=timezone.now(),
             )
-            
-            # Update order status
-            order = payment_intent_obj.order
-            order.status = 'paid'
-            order.paid_at = timezone.now()
-            order.payment_intent_id = payment_intent.id
-            order.payment_method = 'card'
-            order.payment_status = 'succeeded'
-            order.save()
+            if not paid:
+                return Response(
+                    {'error': 'Order is no longer awaiting payment; the payment will be refunded'},
+                    status=status.HTTP_409_CONFLICT
+                )
             
             return Response({
                 'status': 'succeeded',
@@ -237,33 +231,21 @@ def stripe_webhook(request):
 
 def handle_payment_intent_succeeded(payment_intent_data):
     """Handle successful payment intent."""
-    from django.utils import timezone
-    
     try:
         payment_intent = PaymentIntent.objects.get(
             stripe_payment_intent_id=payment_intent_data['id']
         )
         
-        # Create Payment record
-        Payment.objects.create(
-            stripe_payment_intent_id=payment_intent_data['id'],
+        payment, order, paid = settle_payment(
+            payment_intent.order_id,
+            payment_intent_data['id'],
             stripe_charge_id=payment_intent_data.get('latest_charge'),
-            order=payment_intent.order,
             amount=payment_intent.amount,
             currency=payment_intent.currency,
-            status='succeeded',
             payment_method='card',
-            paid_at=timezone.now(),
         )
-        
-        # Update order status
-        order = payment_intent.order
-        order.status = 'paid'
-        order.paid_at = timezone.now()
-        order.payment_intent_id = payment_intent_data['id']
-        order.payment_method = 'card'
-        order.payment_status = 'succeeded'
-        order.save()
+        if not paid:
+            return
         
         logger.info(f"Payment succeeded for order {order.order_number}")
         
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+# One nextval() reserves a block of 20 numbers; keep in sync with
+# api.numbers.TICKET_NUMBERS.
+CREATE_SEQUENCE_SQL = """
+CREATE SEQUENCE IF NOT EXISTS support_ticket_number_seq INCREMENT BY 20 START WITH 1;
+"""
+
+DROP_SEQUENCE_SQL = """
+DROP SEQUENCE IF EXISTS support_ticket_number_seq;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SEQUENCE_SQL, DROP_SEQUENCE_SQL),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from accounts.models import User
+from api.numbers import TICKET_NUMBERS
 
 
 class SupportTicket(models.Model):
@@ -66,8 +67,8 @@ class SupportTicket(models.Model):
     
     def generate_ticket_number(self):
         """Generate unique ticket number."""
-        import uuid
-        return f"TICKET-{uuid.uuid4().hex[:8].upper()}"
+        # Ten digits never clash with the older TICKET-<8 hex> numbers.
+        return f"TICKET-{TICKET_NUMBERS.next():010d}"
 
 
 class TicketMessage(models.Model):